@@ -1,59 +1,138 @@
-from bs4 import BeautifulSoup
 import json
 import asyncio
-from crawl4ai import AsyncWebCrawler
+from browser_pool import close_default_pool, get_default_pool
+from itertools import product
+from listing_parser import Field, Group, ListingSpec, class_is, has_class
+from listing_stream import LOAD_MORE_JS, MAX_PAGES, stream_listings
+from price_history import get_price_history
+from scrape_batch import BATCH_CONCURRENCY, iter_batch, run_batch
+from scraper_cache import PRICE_TTL, cached_scrape, get_default_cache
+from telemetry import span
 
-async def scrape_flights(src, des, ddate, rdate, adult, child, infant):
+BING_DOMAIN = 'www.bing.com'
+
+def build_bing_url(src, des, ddate, rdate, adult, child, infant):
     # Construct the Bing flights search URL
-    bing_url = (
+    return (
         f"https://www.bing.com/travel/flight-search?q=flights+from+{src}-{des}&src={src}&des={des}&ddate={ddate}&isr=1&rdate={rdate}&cls=0&adult={adult}&child={child}&infant={infant}"
     )
 
-    async with AsyncWebCrawler(verbose=True) as crawler:
+# Fields read from each Bing flight card
+def _join_price(record):
+    currency = record.pop('currency')
+    price_value = record.pop('price_value')
+    record['price'] = f"{currency} {price_value}" if currency is not None and price_value is not None else None
+    return record
+
+FLIGHT_LISTING = ListingSpec(
+    cards=f"//div[{class_is('itrCard itrSummaryCard fbPreventScroll')}]",
+    fields=[
+        Group(f".//div[{class_is('itrTxtPair airlinePair')}]", [
+            Field('airline_name', f"(.//div[{has_class('bt_focusText')}])[last()]//div", index=-1),
+            Field('departure_arrival', './/span')
+        ]),
+        Group(f".//div[{class_is('itrTxtPair durationPair')}]", [
+            Field('departure_time', './/span'),
+            Field('journey_duration', './/span', index=1)
+        ]),
+        Group(f".//div[{class_is('itrTxtPair pricePair')}]//span[{has_class('itrPriceVal')}]", [
+            Field('currency', attr='title'),
+            Field('price_value', './/div', index=-1)
+        ])
+    ],
+    post=_join_price
+)
+
+def parse_flights(html):
+    # Parse Bing results
+    with span("parse", site="bing"):
+        return FLIGHT_LISTING.parse(html)
+
+# CSS form of FLIGHT_LISTING's cards, for waiting on new ones in the browser
+FLIGHT_CARD_CSS = "div.itrCard.itrSummaryCard"
+
+# Flights as Bing renders them, loading more results only while the caller wants them
+async def stream_flights(src, des, ddate, rdate, adult, child, infant, limit=None, until=None, max_pages=MAX_PAGES, pool=None):
+    pool = pool or get_default_pool()
+    async with pool.crawler() as crawler:
+        url = build_bing_url(src, des, ddate, rdate, adult, child, infant)
+        async for flight in stream_listings(crawler, url, FLIGHT_LISTING, FLIGHT_CARD_CSS, limit, until, max_pages, site="bing"):
+            yield flight
+
+# With a limit, only as many result pages are loaded as it takes to find that many flights
+async def crawl_flights(src, des, ddate, rdate, adult, child, infant, pool=None, limit=None):
+    if limit is not None:
+        return [flight async for flight in stream_flights(src, des, ddate, rdate, adult, child, infant, limit=limit, pool=pool)]
+
+    # Borrow an already running browser instead of launching one per search
+    pool = pool or get_default_pool()
+    async with pool.crawler() as crawler:
         # Crawl Bing
-        bing_js_code = ["const loadMoreButton = Array.from(document.querySelectorAll('button')).find(button => button.textContent.includes('Load More')); loadMoreButton && loadMoreButton.click();"]
-        bing_result = await crawler.arun(
-            url=bing_url,
-            js_code=bing_js_code,
-            css_selector="",
-            bypass_cache=True
-        )
-
-        # Parse Bing results
-        bing_soup = BeautifulSoup(bing_result.html, 'html.parser')
-
-        # Find all flight listings
-        flight_listings = bing_soup.find_all('div', {'class': 'itrCard itrSummaryCard fbPreventScroll'})
-
-        flights = []
-
-        for listing in flight_listings:
-            # Extract flight details
-            airline_name_divs = listing.find('div', {'class': 'itrTxtPair airlinePair'}).find_all('div', {'class': 'bt_focusText'})
-            airline_name = airline_name_divs[-1].find_all('div')[-1].get_text(strip=True) if airline_name_divs else None
-            departure_arrival = listing.find('div', {'class': 'itrTxtPair airlinePair'}).find('span').get_text(strip=True) if listing.find('div', {'class': 'itrTxtPair airlinePair'}) else None
-            departure_time = listing.find('div', {'class': 'itrTxtPair durationPair'}).find('span').get_text(strip=True) if listing.find('div', {'class': 'itrTxtPair durationPair'}) else None
-            journey_duration = listing.find('div', {'class': 'itrTxtPair durationPair'}).find_all('span')[1].get_text(strip=True) if listing.find('div', {'class': 'itrTxtPair durationPair'}) else None
-            price_span = listing.find('div', {'class': 'itrTxtPair pricePair'}).find('span', {'class': 'itrPriceVal'})
-            if price_span:
-                currency = price_span.get('title', '').strip()
-                price_value = price_span.find_all('div')[-1].get_text(strip=True)
-                price = f"{currency} {price_value}"
-            else:
-                price = None
-            flights.append({
-                'airline_name': airline_name,
-                'departure_arrival': departure_arrival,
-                'departure_time': departure_time,
-                'journey_duration': journey_duration,
-                'price': price
-            })
-
-        # Convert the list of flights to JSON
-        flights_json = json.dumps(flights, indent=4, ensure_ascii=False)
-
-        # Print the JSON
-        print(flights_json)
+        bing_js_code = [LOAD_MORE_JS]
+        with span("crawler.arun", site="bing"):
+            bing_result = await crawler.arun(
+                url=build_bing_url(src, des, ddate, rdate, adult, child, infant),
+                js_code=bing_js_code,
+                css_selector="",
+                bypass_cache=True
+            )
+
+        return parse_flights(bing_result.html)
+
+# `throttle`, when given, is awaited before every live crawl (see scrape_batch)
+async def scrape_flights(src, des, ddate, rdate, adult, child, infant, use_cache=True, pool=None, limit=None, throttle=None):
+    # Every live crawl also goes into the price history
+    async def crawl_and_record(pool=pool):
+        if throttle:
+            await throttle()
+        flights = await crawl_flights(src, des, ddate, rdate, adult, child, infant, pool, limit)
+        # SQLite writes block, so keep them off the event loop
+        await asyncio.to_thread(get_price_history().record_flights, src, des, ddate, rdate, flights)
+        return flights
+
+    if not use_cache:
+        return await crawl_and_record()
+
+    # Identical searches are served from the parsed-listing cache instead of a new browser render
+    params = {'src': src, 'des': des, 'ddate': ddate, 'rdate': rdate, 'adult': adult, 'child': child, 'infant': infant}
+    if limit is not None:
+        params['limit'] = limit
+    return await cached_scrape(
+        get_default_cache(),
+        'flights',
+        params,
+        crawl_and_record,
+        ttl=PRICE_TTL,
+        # Revalidation runs on the cache's own loop, so it uses that loop's default pool
+        refresh=lambda: crawl_and_record(None)
+    )
+
+# One query per route and (departure, return) date window, e.g. from scrape_batch.date_windows
+def flight_queries(routes, date_windows, adult=1, child=0, infant=0):
+    return [
+        {'src': src, 'des': des, 'ddate': ddate, 'rdate': rdate, 'adult': adult, 'child': child, 'infant': infant}
+        for (src, des), (ddate, rdate) in product(routes, date_windows)
+    ]
+
+# Yield a BatchResult for each flight query as soon as its search finishes
+async def iter_flights_batch(queries, concurrency=BATCH_CONCURRENCY, limiter=None, use_cache=True, pool=None):
+    async def fetch(query, throttle):
+        return await scrape_flights(**query, use_cache=use_cache, pool=pool, throttle=throttle)
+
+    async for item in iter_batch(queries, fetch, BING_DOMAIN, concurrency, limiter):
+        yield item
+
+async def scrape_flights_batch(queries, concurrency=BATCH_CONCURRENCY, limiter=None, use_cache=True, pool=None):
+    async def fetch(query, throttle):
+        return await scrape_flights(**query, use_cache=use_cache, pool=pool, throttle=throttle)
+
+    return await run_batch(queries, fetch, BING_DOMAIN, concurrency, limiter)
+
+async def main(src, des, ddate, rdate, adult, child, infant):
+    try:
+        return await scrape_flights(src, des, ddate, rdate, adult, child, infant)
+    finally:
+        await close_default_pool()
 
 if __name__ == "__main__":
     # Define the query parameters for Bing flights search
@@ -65,4 +144,10 @@ if __name__ == "__main__":
     child = 0
     infant = 0
 
-    asyncio.run(scrape_flights(src, des, ddate, rdate, adult, child, infant))
\ No newline at end of file
+    flights = asyncio.run(main(src, des, ddate, rdate, adult, child, infant))
+
+    # Convert the list of flights to JSON
+    flights_json = json.dumps(flights, indent=4, ensure_ascii=False)
+
+    # Print the JSON
+    print(flights_json)
\ No newline at end of file
@@ -1,7 +1,162 @@
 import asyncio
-from crawl4ai import AsyncWebCrawler
-from bs4 import BeautifulSoup
 import json
+from browser_pool import close_default_pool, get_default_pool
+from itertools import product
+from listing_parser import Field, Group, ListingSpec, has_class
+from listing_stream import LOAD_MORE_JS, MAX_PAGES, stream_listings
+from price_history import get_price_history
+from scrape_batch import BATCH_CONCURRENCY, iter_batch, run_batch
+from scraper_cache import METADATA_TTL, PRICE_TTL, cached_scrape, get_default_cache
+from telemetry import span
+
+BOOKING_DOMAIN = 'www.booking.com'
+
+# Fields that describe the property itself rather than the current offer
+HOTEL_METADATA_FIELDS = ('location', 'distance', 'review_score', 'review_rating', 'reviews')
+
+def build_booking_url(destination, checkin_date, checkout_date, group_adults, no_rooms, group_children, child_age):
+    return f"https://www.booking.com/searchresults.html?ss={destination}&checkin={checkin_date}&checkout={checkout_date}&group_adults={group_adults}&no_rooms={no_rooms}&group_children={group_children}&age={child_age}"
+
+# Fields read from each Booking.com property card
+HOTEL_LISTING = ListingSpec(
+    cards="//div[@data-testid='property-card']",
+    fields=[
+        Field('hotel_name', ".//div[@data-testid='title']"),
+        Field('location', ".//span[@data-testid='address']"),
+        Field('distance', ".//span[@data-testid='distance']"),
+        Field('price', ".//span[@data-testid='price-and-discounted-price']"),
+        Group(".//div[@data-testid='review-score']", [
+            Field('review_score', f".//div[{has_class('ac4a7896c7')}]", transform=lambda text: text.replace('Scored', '').strip()),
+            Field('review_rating', f".//div[{has_class('cb2cbb3ccb')}]"),
+            Field('reviews', f".//div[{has_class('abf093bdfe')}]")
+        ])
+    ]
+)
+
+def parse_hotels(html):
+    # Parse Booking.com results
+    with span("parse", site="booking"):
+        return HOTEL_LISTING.parse(html)
+
+# CSS form of HOTEL_LISTING's cards, for waiting on new ones in the browser
+HOTEL_CARD_CSS = "div[data-testid='property-card']"
+
+# Hotels as Booking.com renders them, loading more results only while the caller wants them,
+# e.g. `until=lambda hotel: float(hotel['review_score'] or 0) >= 9` stops at the first great one
+async def stream_hotels(destination, checkin_date, checkout_date, group_adults, no_rooms, group_children, child_age,
+                        limit=None, until=None, max_pages=MAX_PAGES, pool=None):
+    pool = pool or get_default_pool()
+    async with pool.crawler() as crawler:
+        url = build_booking_url(destination, checkin_date, checkout_date, group_adults, no_rooms, group_children, child_age)
+        async for hotel in stream_listings(crawler, url, HOTEL_LISTING, HOTEL_CARD_CSS, limit, until, max_pages, site="booking"):
+            yield hotel
+
+# With a limit, only as many result pages are loaded as it takes to find that many hotels
+async def crawl_hotels(destination, checkin_date, checkout_date, group_adults, no_rooms, group_children, child_age, pool=None, limit=None):
+    if limit is not None:
+        return [
+            hotel async for hotel in stream_hotels(
+                destination, checkin_date, checkout_date, group_adults, no_rooms, group_children, child_age, limit=limit, pool=pool
+            )
+        ]
+
+    # Borrow an already running browser instead of launching one per search
+    pool = pool or get_default_pool()
+    async with pool.crawler() as crawler:
+        js_code = [LOAD_MORE_JS]
+        with span("crawler.arun", site="booking"):
+            result = await crawler.arun(
+                url=build_booking_url(destination, checkin_date, checkout_date, group_adults, no_rooms, group_children, child_age),
+                js_code=js_code,
+                css_selector="",
+                bypass_cache=True
+            )
+
+        return parse_hotels(result.html)
+
+# Static details of every hotel seen in a destination, in one long-lived entry per destination
+# so they outlast the price entries without crowding them out of the cache
+def store_hotel_metadata(cache, destination, hotels):
+    metadata, _ = cache.get('hotel_metadata', {'destination': destination})
+    metadata = metadata or {}
+    for hotel in hotels:
+        if hotel.get('hotel_name'):
+            metadata[hotel['hotel_name'].strip().lower()] = {field: hotel.get(field) for field in HOTEL_METADATA_FIELDS}
+    cache.set('hotel_metadata', {'destination': destination}, metadata, ttl=METADATA_TTL)
+
+# Fill the fields a listing lacks (e.g. from Booking lite, which only has names and prices)
+def with_hotel_metadata(destination, hotels, cache=None):
+    metadata, _ = (cache or get_default_cache()).get('hotel_metadata', {'destination': destination})
+    if not metadata:
+        return hotels
+    filled = []
+    for hotel in hotels:
+        known = metadata.get((hotel.get('hotel_name') or '').strip().lower(), {})
+        filled.append({**known, **{field: value for field, value in hotel.items() if value is not None}})
+    return filled
+
+# `throttle`, when given, is awaited before every live crawl (see scrape_batch)
+async def scrape_hotels(destination, checkin_date, checkout_date, group_adults, no_rooms, group_children, child_age, use_cache=True, pool=None, limit=None,
+                        throttle=None):
+    # Every live crawl also goes into the price history
+    async def crawl_and_record(pool=pool):
+        if throttle:
+            await throttle()
+        hotels = await crawl_hotels(destination, checkin_date, checkout_date, group_adults, no_rooms, group_children, child_age, pool, limit)
+        # SQLite writes block, so keep them off the event loop
+        await asyncio.to_thread(get_price_history().record_hotels, destination, checkin_date, checkout_date, hotels)
+        if use_cache:
+            await asyncio.to_thread(store_hotel_metadata, get_default_cache(), destination, hotels)
+        return hotels
+
+    if not use_cache:
+        return await crawl_and_record()
+
+    # Identical searches are served from the parsed-listing cache instead of a new browser render
+    params = {
+        'destination': destination,
+        'checkin_date': checkin_date,
+        'checkout_date': checkout_date,
+        'group_adults': group_adults,
+        'no_rooms': no_rooms,
+        'group_children': group_children,
+        'child_age': child_age
+    }
+    if limit is not None:
+        params['limit'] = limit
+    # Revalidation runs on the cache's own loop, so it uses that loop's default pool
+    return await cached_scrape(
+        get_default_cache(), 'hotels', params, crawl_and_record, ttl=PRICE_TTL, refresh=lambda: crawl_and_record(None)
+    )
+
+# One query per destination and (checkin, checkout) stay, e.g. from scrape_batch.date_windows
+def hotel_queries(destinations, stays, group_adults=2, no_rooms=1, group_children=0, child_age=0):
+    return [
+        {
+            'destination': destination,
+            'checkin_date': checkin_date,
+            'checkout_date': checkout_date,
+            'group_adults': group_adults,
+            'no_rooms': no_rooms,
+            'group_children': group_children,
+            'child_age': child_age
+        }
+        for destination, (checkin_date, checkout_date) in product(destinations, stays)
+    ]
+
+# Yield a BatchResult for each hotel query as soon as its search finishes
+async def iter_hotels_batch(queries, concurrency=BATCH_CONCURRENCY, limiter=None, use_cache=True, pool=None):
+    async def fetch(query, throttle):
+        return await scrape_hotels(**query, use_cache=use_cache, pool=pool, throttle=throttle)
+
+    async for item in iter_batch(queries, fetch, BOOKING_DOMAIN, concurrency, limiter):
+        yield item
+
+async def scrape_hotels_batch(queries, concurrency=BATCH_CONCURRENCY, limiter=None, use_cache=True, pool=None):
+    async def fetch(query, throttle):
+        return await scrape_hotels(**query, use_cache=use_cache, pool=pool, throttle=throttle)
+
+    return await run_batch(queries, fetch, BOOKING_DOMAIN, concurrency, limiter)
 
 async def main():
     # Define the query parameters for Booking.com
@@ -13,53 +168,16 @@ async def main():
     group_children = 1
     child_age = 10
 
-    async with AsyncWebCrawler(verbose=True) as crawler:
-        js_code = ["const loadMoreButton = Array.from(document.querySelectorAll('button')).find(button => button.textContent.includes('Load More')); loadMoreButton && loadMoreButton.click();"]
-        result = await crawler.arun(
-            url=f"https://www.booking.com/searchresults.html?ss={destination}&checkin={checkin_date}&checkout={checkout_date}&group_adults={group_adults}&no_rooms={no_rooms}&group_children={group_children}&age={child_age}",
-            js_code=js_code,
-            css_selector="",
-            bypass_cache=True
-        )
-        
-        # Parse Booking.com results
-        soup = BeautifulSoup(result.html, 'html.parser')
-
-        # Find all property cards
-        property_cards = soup.find_all('div', {'data-testid': 'property-card'})
-
-        hotels = []
-
-        for card in property_cards:
-            # Extract hotel name
-            hotel_name = card.find('div', {'data-testid': 'title'}).get_text(strip=True) if card.find('div', {'data-testid': 'title'}) else None
-
-            # Extract location
-            location = card.find('span', {'data-testid': 'address'}).get_text(strip=True) if card.find('span', {'data-testid': 'address'}) else None
-
-            # Extract distance from center
-            distance = card.find('span', {'data-testid': 'distance'}).get_text(strip=True) if card.find('span', {'data-testid': 'distance'}) else None
-
-            # Extract review score
-            review_score_div = card.find('div', {'data-testid': 'review-score'})
-            review_score = review_score_div.find('div', class_='ac4a7896c7').get_text(strip=True).replace('Scored', '').strip() if review_score_div else None
-            review_rating = review_score_div.find('div', class_='cb2cbb3ccb').get_text(strip=True) if review_score_div else None
-            reviews = review_score_div.find('div', class_='abf093bdfe').get_text(strip=True) if review_score_div else None
-
-            hotels.append({
-                'hotel_name': hotel_name,
-                'location': location,
-                'distance': distance,
-                'review_score': review_score,
-                'review_rating': review_rating,
-                'reviews': reviews
-            })
-
-        # Convert the list of hotels to JSON
-        hotels_json = json.dumps(hotels, indent=4, ensure_ascii=False)
-
-        # Print the JSON
-        print(hotels_json)
+    try:
+        hotels = await scrape_hotels(destination, checkin_date, checkout_date, group_adults, no_rooms, group_children, child_age)
+    finally:
+        await close_default_pool()
+
+    # Convert the list of hotels to JSON
+    hotels_json = json.dumps(hotels, indent=4, ensure_ascii=False)
+
+    # Print the JSON
+    print(hotels_json)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -1,16 +1,8 @@
 import streamlit as st
-from langchain_groq import ChatGroq
 from langchain_groq.chat_models import ChatMessage
-from dotenv import load_dotenv
-import os
 import json
-
-# Load environment variables
-load_dotenv()
-
-# Initialize the Groq LLM
-groq_api_key = os.getenv("GROQ_API_KEY")
-llm = ChatGroq(temperature=0.7, groq_api_key=groq_api_key, model_name="mixtral-8x7b-32768")
+from resources import get_llm
+from slot_filler import extract_slots
 
 # Define required parameters
 REQUIRED_PARAMETERS = {
@@ -30,70 +22,168 @@ def initialize_session_state():
         st.session_state.messages = []
     if "parameters" not in st.session_state:
         st.session_state.parameters = {k: None for k in REQUIRED_PARAMETERS}
+    if "summary" not in st.session_state:
+        st.session_state.summary = ""
+    if "pending_input" not in st.session_state:
+        st.session_state.pending_input = None
     if "confirmed" not in st.session_state:
         st.session_state.confirmed = False
     if "initialized" not in st.session_state:
         st.session_state.initialized = False
 
-def get_chat_response(user_input):
-    # Construct the conversation history
-    conversation_history = "\n".join([
-        f"{'Customer' if msg['role'] == 'user' else 'Agent'}: {msg['content']}"
-        for msg in st.session_state.messages
-    ])
-    
-    # Create the prompt for the LLM
-    prompt = f"""You are Alex, a friendly travel agent. Your task is to collect travel details from customers in a natural conversation.
+# Bounds on the context carried between turns, so prompt size stays flat as the chat grows
+MAX_SUMMARY_CHARS = 600
+MAX_LAST_REPLY_CHARS = 400
+
+def build_prompt(user_input, parameters, summary, last_reply):
+    known = {k: v for k, v in parameters.items() if v is not None}
+    missing = [k for k, v in parameters.items() if v is None]
+
+    return f"""You are Alex, a friendly travel agent. Your task is to collect travel details from customers in a natural conversation.
+
+Summary of the conversation so far: {summary or "The conversation has just started."}
+
+Details collected so far: {json.dumps(known)}
 
-Current conversation history:
-{conversation_history}
+Missing parameters: {missing}
+
+Your previous message: {last_reply[-MAX_LAST_REPLY_CHARS:]}
 
 Customer's latest message: {user_input}
 
 Instructions:
 1. Maintain a friendly, conversational tone
-2. Extract any travel details from the user's message
+2. Extract any travel details from the customer's latest message
 3. If any information is unclear or missing, ask for clarification
 4. Focus on collecting missing information naturally
 5. Once all details are collected, summarize and ask for confirmation
 
-Respond in a conversational response. Include any assumptions made in the response. 
-
-Missing parameters: {[k for k, v in st.session_state.parameters.items() if v is None]}"""
+Respond in a conversational response. Include any assumptions made in the response.
+After the response, add a line starting with JSON_DATA: followed by a single JSON object of the form
+{{"parameters": {{...}}, "summary": "..."}}
+"parameters" holds only the details the customer stated or changed in this message, using these keys: {list(REQUIRED_PARAMETERS)}.
+"summary" is an updated summary of the whole conversation in at most {MAX_SUMMARY_CHARS} characters."""
 
-    messages = [ChatMessage(role="user", content=prompt)]
-    response = llm(messages)
-    
-    # Split response into conversation part and JSON part
-    parts = response.content.split('JSON_DATA:')
+# Split the model output into the customer-facing reply and the structured JSON_DATA block
+def parse_response(content):
+    parts = content.split('JSON_DATA:', 1)
     conversation_response = parts[0].strip()
-    
-    # Extract JSON data
+
     try:
         json_str = parts[1].strip()
-        extracted_params = json.loads(json_str)
-    except (IndexError, json.JSONDecodeError):
-        extracted_params = st.session_state.parameters.copy()
-    
-    return conversation_response, extracted_params
+        data = json.loads(json_str[json_str.index('{'):json_str.rindex('}') + 1])
+    except (IndexError, ValueError):
+        return conversation_response, {}, None
+
+    parameters = data.get('parameters') if isinstance(data.get('parameters'), dict) else {}
+    summary = data.get('summary') if isinstance(data.get('summary'), str) else None
+    return conversation_response, parameters, summary
+
+def last_assistant_message():
+    for msg in reversed(st.session_state.messages):
+        if msg['role'] == 'assistant':
+            return msg['content']
+    return ""
+
+def roll_summary(user_input):
+    st.session_state.summary = f"{st.session_state.summary} Customer: {user_input}".strip()[-MAX_SUMMARY_CHARS:]
+
+def join_words(words):
+    return words[0] if len(words) == 1 else f"{', '.join(words[:-1])} and {words[-1]}"
+
+# Reply for messages the local extractor fully understood, without an LLM round-trip
+def local_reply(new_slots, parameters):
+    noted = join_words([f"{REQUIRED_PARAMETERS[k]}: {v}" for k, v in new_slots.items()])
+    missing = [REQUIRED_PARAMETERS[k] for k, v in parameters.items() if v is None]
+    if missing:
+        return f"Got it! I've noted {noted}. Could you also tell me the {join_words(missing)}?"
+    return f"Got it! I've noted {noted}. That's everything I need, please review your travel details below."
+
+# Local extraction first; the prompt is None when the LLM isn't needed for this message
+def prepare_turn(user_input):
+    # Slots that can be read deterministically are filled locally
+    local = extract_slots(user_input, current=st.session_state.parameters)
+    if local.fully_resolved:
+        return local, None
+
+    # Only the new message, the slot state and a bounded summary are sent, never the full transcript
+    parameters = {**st.session_state.parameters, **local.certain_slots}
+    return local, build_prompt(user_input, parameters, st.session_state.summary, last_assistant_message())
+
+def finish_turn(user_input, local, content=None):
+    if content is None:
+        roll_summary(user_input)
+        return local_reply(local.slots, {**st.session_state.parameters, **local.slots}), local.slots
+
+    conversation_response, extracted_params, summary = parse_response(content)
+    if summary:
+        st.session_state.summary = summary[:MAX_SUMMARY_CHARS]
+    else:
+        # Keep the summary rolling even when the model skips it
+        roll_summary(user_input)
+
+    # The local reading wins for the slots it was certain about; its guesses only fill gaps
+    guesses = {
+        slot: value for slot, value in local.slots.items()
+        if slot in local.tentative and extracted_params.get(slot) in (None, "")
+    }
+    return conversation_response, {**extracted_params, **guesses, **local.certain_slots}
+
+def get_chat_response(user_input):
+    local, prompt = prepare_turn(user_input)
+    if prompt is None:
+        return finish_turn(user_input, local)
+
+    messages = [ChatMessage(role="user", content=prompt)]
+    response = get_llm(0.7)(messages)
+    return finish_turn(user_input, local, response.content)
+
+JSON_MARKER = 'JSON_DATA:'
+
+# Yield the reply as it is generated, holding back the trailing JSON_DATA block
+def stream_chat_response(user_input):
+    local, prompt = prepare_turn(user_input)
+    if prompt is None:
+        response, new_params = finish_turn(user_input, local)
+        yield response
+    else:
+        content = ""
+        emitted = 0
+        for chunk in get_llm(0.7).stream([ChatMessage(role="user", content=prompt)]):
+            content += chunk.content
+            if JSON_MARKER in content:
+                visible = content.split(JSON_MARKER, 1)[0]
+            else:
+                # The end of the text may be the start of the marker, so keep it back for now
+                visible = content[:max(0, len(content) - len(JSON_MARKER))]
+            if len(visible) > emitted:
+                yield visible[emitted:]
+                emitted = len(visible)
+        yield content.split(JSON_MARKER, 1)[0].rstrip()[emitted:]
+        response, new_params = finish_turn(user_input, local, content)
+
+    update_parameters(new_params)
+    st.session_state.messages.append({"role": "assistant", "content": response})
+
+def stream_with_prefix(prefix, chunks):
+    yield prefix
+    yield from chunks
 
 def update_parameters(new_params):
     for key, value in new_params.items():
-        if value and key in st.session_state.parameters:
+        # 0 is a real answer for children, infants etc., so only skip empty values
+        if value is not None and value != "" and key in st.session_state.parameters:
             st.session_state.parameters[key] = value
 
 def all_parameters_filled():
-    return all(st.session_state.parameters.values())
+    return all(value is not None for value in st.session_state.parameters.values())
 
 def handle_user_input():
     user_input = st.session_state.user_input
     if user_input.strip():
         st.session_state.messages.append({"role": "user", "content": user_input})
-        
-        response, new_params = get_chat_response(user_input)
-        update_parameters(new_params)
-        
-        st.session_state.messages.append({"role": "assistant", "content": response})
+        # The reply is streamed by main() on this rerun, below the conversation
+        st.session_state.pending_input = user_input
         st.session_state.user_input = ""  # Clear the input field
 
 def main():
@@ -122,7 +212,12 @@ def main():
                 st.write(f"You: {message['content']}")
             else:
                 st.write(f"AI Agent: {message['content']}")
-        
+
+        if st.session_state.pending_input:
+            user_input = st.session_state.pending_input
+            st.session_state.pending_input = None
+            st.write_stream(stream_with_prefix("AI Agent: ", stream_chat_response(user_input)))
+
         st.text_area("Tell me about your travel plans:", key="user_input", height=100, on_change=handle_user_input)
         
         if all_parameters_filled():
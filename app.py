@@ -1,112 +1,304 @@
 import os
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
+from context_budget import SUMMARY_CONTEXT_TOKENS, compact_context
 from crewai import Agent, Task, Crew, Process
-from langchain_groq import ChatGroq
-from langchain_community.tools import DuckDuckGoSearchRun
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Initialize the Groq LLM
-groq_api_key = os.getenv("GROQ_API_KEY")
-llm = ChatGroq(temperature=0.3, groq_api_key=groq_api_key, model_name="mixtral-8x7b-32768")
-
-# Initialize the search tool
-search_tool = DuckDuckGoSearchRun()
-
-# Define agents
-sight_suggester = Agent(
-    role='Sight Suggester',
-    goal='Suggest interesting sights and attractions to visit based on the traveler\'s preferences',
-    backstory='You are an experienced travel expert with knowledge of global attractions.',
-    verbose=True,
-    allow_delegation=False,
-    llm=llm,
-    tools=[search_tool]
-)
-
-transport_planner = Agent(
-    role='Transport Planner',
-    goal='Suggest suitable ways of transportation for the traveler',
-    backstory='You are a transportation expert with knowledge of various modes of travel.',
-    verbose=True,
-    allow_delegation=False,
-    llm=llm,
-    tools=[search_tool]
-)
-
-accommodation_finder = Agent(
-    role='Accommodation Finder',
-    goal='Suggest appropriate places to stay based on the traveler\'s preferences and budget',
-    backstory='You are an accommodation specialist with knowledge of various lodging options.',
-    verbose=True,
-    allow_delegation=False,
-    llm=llm,
-    tools=[search_tool]
-)
-
-legal_advisor = Agent(
-    role='Legal Advisor',
-    goal='Review and advise on legal limitations and requirements for the traveler',
-    backstory='You are a legal expert specializing in international travel regulations.',
-    verbose=True,
-    allow_delegation=False,
-    llm=llm,
-    tools=[search_tool]
-)
-
-summary_writer = Agent(
-    role='Summary Writer',
-    goal='Generate a comprehensive summary of the travel plan',
-    backstory='You are a skilled writer able to concisely summarize complex information.',
-    verbose=True,
-    allow_delegation=False,
-    llm=llm
-)
+from job_queue import ACTIVE_STATUSES, CANCELLED, DONE, QUEUED, JobQueue, JobRejected
+from resources import get_flight_search_tool, get_hotel_search_tool, get_llm, get_price_history_tool, get_search_tool, resource
+from semantic_cache import get_plan_cache
+from telemetry import REGISTRY, cache_hit_rate, span, start_metrics_server
+
+# Fan-out settings for the specialist agents
+MAX_CONCURRENCY = int(os.getenv("PLANNER_MAX_CONCURRENCY", "4"))
+TASK_TIMEOUT = float(os.getenv("PLANNER_TASK_TIMEOUT", "300"))
+# How often the UI checks on a running plan, and the job store is updated with summary text
+JOB_POLL_INTERVAL = float(os.getenv("PLANNER_POLL_INTERVAL", "1.0"))
+
+# Define agents. crewai agents keep per-run state (their executor's tools, iteration count), so
+# every plan gets its own set; the LLM and tools they use are shared.
+def build_agents():
+    llm = get_llm(0.3)
+    search_tool = get_search_tool()
+    # Transport and accommodation can check recently scraped prices before searching the web,
+    # and fetch live prices merged across sites when the history has none
+    price_history_tool = get_price_history_tool()
+
+    sight_suggester = Agent(
+        role='Sight Suggester',
+        goal='Suggest interesting sights and attractions to visit based on the traveler\'s preferences',
+        backstory='You are an experienced travel expert with knowledge of global attractions.',
+        verbose=True,
+        allow_delegation=False,
+        llm=llm,
+        tools=[search_tool]
+    )
+
+    transport_planner = Agent(
+        role='Transport Planner',
+        goal='Suggest suitable ways of transportation for the traveler',
+        backstory='You are a transportation expert with knowledge of various modes of travel.',
+        verbose=True,
+        allow_delegation=False,
+        llm=llm,
+        tools=[price_history_tool, get_flight_search_tool(), search_tool]
+    )
+
+    accommodation_finder = Agent(
+        role='Accommodation Finder',
+        goal='Suggest appropriate places to stay based on the traveler\'s preferences and budget',
+        backstory='You are an accommodation specialist with knowledge of various lodging options.',
+        verbose=True,
+        allow_delegation=False,
+        llm=llm,
+        tools=[price_history_tool, get_hotel_search_tool(), search_tool]
+    )
+
+    legal_advisor = Agent(
+        role='Legal Advisor',
+        goal='Review and advise on legal limitations and requirements for the traveler',
+        backstory='You are a legal expert specializing in international travel regulations.',
+        verbose=True,
+        allow_delegation=False,
+        llm=llm,
+        tools=[search_tool]
+    )
+
+    summary_writer = Agent(
+        role='Summary Writer',
+        goal='Generate a comprehensive summary of the travel plan',
+        backstory='You are a skilled writer able to concisely summarize complex information.',
+        verbose=True,
+        allow_delegation=False,
+        llm=llm
+    )
+
+    return {
+        'sight_suggester': sight_suggester,
+        'transport_planner': transport_planner,
+        'accommodation_finder': accommodation_finder,
+        'legal_advisor': legal_advisor,
+        'summary_writer': summary_writer
+    }
 
 # Define tasks
-def create_tasks(traveler_persona):
+def create_tasks(traveler_persona, agents=None):
+    agents = agents or build_agents()
     return [
         Task(
             description=f"Suggest 5 interesting sights to visit for a traveler with the following persona: {traveler_persona}",
-            agent=sight_suggester
+            agent=agents['sight_suggester']
         ),
         Task(
             description=f"Suggest suitable ways of transportation for a traveler with the following persona: {traveler_persona}",
-            agent=transport_planner
+            agent=agents['transport_planner']
         ),
         Task(
             description=f"Suggest where to sleep (hotels, AirBnbs, open air, etc) for a traveler with the following persona: {traveler_persona}",
-            agent=accommodation_finder
+            agent=agents['accommodation_finder']
         ),
         Task(
             description=f"Review legal limitations and requirements for the proposed travel plan for a traveler with the following persona: {traveler_persona}",
-            agent=legal_advisor
+            agent=agents['legal_advisor']
         ),
         Task(
             description="Generate a summary of the conversation summarizing the travel plan",
-            agent=summary_writer
+            agent=agents['summary_writer']
         )
     ]
 
-# Function to run the Travel Planner
-def run_travel_planner(traveler_persona):
-    tasks = create_tasks(traveler_persona)
-    
-    crew = Crew(
-        agents=[sight_suggester, transport_planner, accommodation_finder, legal_advisor, summary_writer],
-        tasks=tasks,
-        verbose=2,
-        process=Process.sequential
+# Output placeholders for a task that didn't produce an answer; never cached
+class TaskIncomplete(str):
+    pass
+
+class TaskTimeout(TaskIncomplete):
+    pass
+
+class TaskFailed(TaskIncomplete):
+    pass
+
+# Run a single specialist task in the worker pool, bounded by the semaphore and timeout.
+# With a cache, answers to the same or a near-identical task are reused per agent.
+async def run_task(task, executor, semaphore, task_timeout, cache=None):
+    if cache is not None:
+        cached = cache.get(task.agent.role, task.description)
+        if cached is not None:
+            return cached
+
+    async with semaphore:
+        loop = asyncio.get_running_loop()
+        try:
+            with span("task", agent=task.agent.role):
+                output = await asyncio.wait_for(loop.run_in_executor(executor, task.execute), task_timeout)
+        except asyncio.TimeoutError:
+            return TaskTimeout(f"{task.agent.role} did not finish within {task_timeout:.0f} seconds.")
+        except Exception as error:
+            # One failing agent leaves a note in its section instead of sinking the whole plan
+            return TaskFailed(f"{task.agent.role} failed: {error}")
+
+    if cache is not None:
+        cache.set(task.agent.role, task.description, output)
+    return output
+
+# Fan out the independent specialist tasks and collect their outputs in task order.
+# `on_result(index, output)` is called as each task finishes.
+async def run_specialists(tasks, max_concurrency=MAX_CONCURRENCY, task_timeout=TASK_TIMEOUT, on_result=None, cache=None):
+    semaphore = asyncio.Semaphore(max_concurrency)
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    async def run(index, task):
+        output = await run_task(task, executor, semaphore, task_timeout, cache)
+        if on_result:
+            on_result(index, output)
+        return output
+
+    try:
+        return await asyncio.gather(*(run(index, task) for index, task in enumerate(tasks)))
+    finally:
+        # Timed out agents keep their thread until the LLM call returns; don't wait for them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# Key facts of the specialist outputs, deduplicated and cut to a token budget, so the summary
+# call stays the same size however verbose the specialists were
+def build_summary_context(tasks, outputs, budget=SUMMARY_CONTEXT_TOKENS):
+    context, _ = compact_context([task.agent.role for task in tasks], outputs, budget)
+    return context
+
+# The summary writer has no tools, so its answer can be streamed straight from the LLM
+def summary_prompt(summary_task, context):
+    agent = summary_task.agent
+    return (
+        f"You are {agent.role}. {agent.backstory}\n"
+        f"Your personal goal is: {agent.goal}\n\n"
+        f"Task: {summary_task.description}\n\n"
+        f"This is the context you're working with:\n{context}"
     )
-    
-    result = crew.kickoff()
+
+def stream_summary(summary_task, context):
+    with span("task", agent=summary_task.agent.role):
+        for chunk in summary_task.agent.llm.stream(summary_prompt(summary_task, context)):
+            yield chunk.content
+
+# What the plan cache keeps for a persona: each specialist's section and the summary
+def plan_entry(specialist_tasks, outputs, summary):
+    return {
+        'sections': [[task.agent.role, output] for task, output in zip(specialist_tasks, outputs)],
+        'summary': summary
+    }
+
+# Function to run the Travel Planner
+def run_travel_planner(traveler_persona, parallel=True, max_concurrency=MAX_CONCURRENCY, task_timeout=TASK_TIMEOUT, use_cache=True):
+    cache = get_plan_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get('plan', traveler_persona)
+        if cached is not None:
+            return cached['summary']
+
+    agents = build_agents()
+    tasks = create_tasks(traveler_persona, agents)
+
+    if not parallel:
+        crew = Crew(
+            agents=list(agents.values()),
+            tasks=tasks,
+            verbose=2,
+            process=Process.sequential
+        )
+        with span("crew", process="sequential"):
+            return crew.kickoff()
+
+    # Only the summary depends on the other tasks, so run the four specialists concurrently
+    *specialist_tasks, summary_task = tasks
+    outputs = asyncio.run(run_specialists(specialist_tasks, max_concurrency, task_timeout, cache=cache))
+
+    with span("task", agent=summary_task.agent.role):
+        result = summary_task.execute(context=build_summary_context(specialist_tasks, outputs))
+    if cache is not None and not any(isinstance(output, TaskIncomplete) for output in outputs):
+        cache.set('plan', traveler_persona, plan_entry(specialist_tasks, outputs, result))
     return result
 
+# Background job for one plan: sections are stored as each specialist finishes and the summary
+# while it streams, so any session polling the job sees progress
+async def run_plan_job(prompt, job):
+    cache = get_plan_cache()
+    *specialist_tasks, summary_task = create_tasks(prompt)
+
+    def on_result(index, output):
+        job.add_section(specialist_tasks[index].agent.role, output)
+
+    outputs = await run_specialists(specialist_tasks, on_result=on_result, cache=cache)
+    context = build_summary_context(specialist_tasks, outputs)
+
+    def write_summary():
+        summary = ""
+        flushed = time.monotonic()
+        for chunk in stream_summary(summary_task, context):
+            if job.cancelled:
+                return None
+            summary += chunk
+            if time.monotonic() - flushed >= JOB_POLL_INTERVAL:
+                job.set_summary(summary)
+                flushed = time.monotonic()
+        job.set_summary(summary)
+        return summary
+
+    summary = await asyncio.get_running_loop().run_in_executor(None, write_summary)
+    if summary is not None and not any(isinstance(output, TaskIncomplete) for output in outputs):
+        cache.set('plan', prompt, plan_entry(specialist_tasks, outputs, summary))
+
+# One queue per server process, shared by every session
+@resource
+def get_job_queue():
+    return JobQueue(run_plan_job)
+
 # Streamlit UI
+def render_sections(sections):
+    for role, output in sections:
+        with st.expander(role):
+            st.markdown(output)
+
+# Where the time went in this process: span timings, cache hit rates and LLM token usage
+def render_timing_panel():
+    with st.sidebar.expander("Timings"):
+        rows = REGISTRY.span_summary()
+        if rows:
+            st.dataframe(rows, hide_index=True)
+        for cache in ("plan_cache", "search:duckduckgo", "scraper:flights", "scraper:hotels"):
+            if REGISTRY.total("cache_lookups_total", cache=cache):
+                st.caption(f"{cache}: {cache_hit_rate(cache):.0%} hit rate")
+        st.caption(
+            f"LLM tokens: {REGISTRY.total('llm_tokens_total', direction='prompt'):.0f} in, "
+            f"{REGISTRY.total('llm_tokens_total', direction='completion'):.0f} out "
+            f"over {REGISTRY.total('llm_calls_total'):.0f} calls"
+        )
+        st.caption(
+            f"Summary context: {REGISTRY.total('summary_context_tokens_total', stage='budgeted'):.0f} of "
+            f"{REGISTRY.total('summary_context_tokens_total', stage='raw'):.0f} specialist tokens kept"
+        )
+
+# Show what a job has produced so far; the summary grows while it is being written
+def render_job(job):
+    with st.chat_message("assistant"):
+        render_sections(job['sections'])
+        if job['summary']:
+            st.markdown(job['summary'])
+        elif job['status'] in ACTIVE_STATUSES:
+            done = len(job['sections'])
+            st.caption("Waiting for a free planner..." if job['status'] == QUEUED else f"Planning your trip... {done} sections ready")
+
 def main():
     st.title("AI Travel Planner")
+    # Prometheus /metrics endpoint, when TELEMETRY_PROMETHEUS_PORT is set
+    start_metrics_server()
+    jobs = get_job_queue()
+
+    # The per-user job limit counts jobs of this browser session; the client can't choose the id.
+    # The job being watched lives in the URL, so a page refresh picks it up again.
+    if "user_id" not in st.session_state:
+        st.session_state.user_id = uuid.uuid4().hex
+    user_id = st.session_state.user_id
 
     # Initialize chat history
     if "messages" not in st.session_state:
@@ -115,22 +307,56 @@ def main():
     # Display chat messages from history on app rerun
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
+            render_sections(message.get("sections", []))
             st.markdown(message["content"])
 
+    job = jobs.get(st.query_params["job"]) if "job" in st.query_params else None
+    if job is not None:
+        render_job(job)
+        if job['status'] in ACTIVE_STATUSES:
+            if st.button("Cancel"):
+                jobs.cancel(job['id'])
+                st.rerun()
+        else:
+            if job['status'] == DONE:
+                st.session_state.messages.append({"role": "assistant", "content": job['summary'], "sections": job['sections']})
+            else:
+                st.warning("The plan was cancelled." if job['status'] == CANCELLED else f"Planning failed: {job['error']}")
+            del st.query_params["job"]
+            job = None
+
     # React to user input
-    if prompt := st.chat_input("Describe your travel persona/scenario"):
+    if prompt := st.chat_input("Describe your travel persona/scenario", disabled=job is not None):
         # Display user message in chat message container
         st.chat_message("user").markdown(prompt)
         # Add user message to chat history
         st.session_state.messages.append({"role": "user", "content": prompt})
 
-        response = run_travel_planner(prompt)
+        cached = get_plan_cache().get('plan', prompt)
+        if cached is not None:
+            with st.chat_message("assistant"):
+                render_sections(cached['sections'])
+                st.markdown(cached['summary'])
+            st.session_state.messages.append({"role": "assistant", "content": cached['summary'], "sections": cached['sections']})
+        else:
+            try:
+                st.query_params["job"] = jobs.submit(user_id, prompt)
+            except JobRejected as e:
+                st.warning(str(e))
+            else:
+                st.rerun()
+
+    stats = get_plan_cache().stats()
+    st.sidebar.caption(
+        f"Plan cache: {stats['hit_rate']:.0%} hit rate "
+        f"({stats['exact_hits']} exact, {stats['semantic_hits']} similar, {stats['misses']} misses)"
+    )
+    render_timing_panel()
 
-        # Display assistant response in chat message container
-        with st.chat_message("assistant"):
-            st.markdown(response)
-        # Add assistant response to chat history
-        st.session_state.messages.append({"role": "assistant", "content": response})
+    # Poll the job store until the plan is finished
+    if job is not None:
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
 
 if __name__ == "__main__":
     main()
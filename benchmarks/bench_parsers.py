@@ -0,0 +1,128 @@
+# Compare the compiled lxml listing parser with the original BeautifulSoup loops.
+#
+#   python -m benchmarks.bench_parsers                    # benchmarks/data/pages, synthetic pages where there are none
+#   python -m benchmarks.bench_parsers --pages saved/     # saved pages: flights*.html, hotels*.html
+import argparse
+import glob
+import os
+import time
+from bs4 import BeautifulSoup
+from Flights_Scrapper import parse_flights
+from Hotels_Scrapper import parse_hotels
+from benchmarks.pages import flight_page, hotel_page
+
+# The flight loop as it was before listing_parser
+def legacy_parse_flights(html):
+    bing_soup = BeautifulSoup(html, 'html.parser')
+    flight_listings = bing_soup.find_all('div', {'class': 'itrCard itrSummaryCard fbPreventScroll'})
+    flights = []
+    for listing in flight_listings:
+        airline_name_divs = listing.find('div', {'class': 'itrTxtPair airlinePair'}).find_all('div', {'class': 'bt_focusText'})
+        airline_name = airline_name_divs[-1].find_all('div')[-1].get_text(strip=True) if airline_name_divs else None
+        departure_arrival = listing.find('div', {'class': 'itrTxtPair airlinePair'}).find('span').get_text(strip=True) if listing.find('div', {'class': 'itrTxtPair airlinePair'}) else None
+        departure_time = listing.find('div', {'class': 'itrTxtPair durationPair'}).find('span').get_text(strip=True) if listing.find('div', {'class': 'itrTxtPair durationPair'}) else None
+        journey_duration = listing.find('div', {'class': 'itrTxtPair durationPair'}).find_all('span')[1].get_text(strip=True) if listing.find('div', {'class': 'itrTxtPair durationPair'}) else None
+        price_span = listing.find('div', {'class': 'itrTxtPair pricePair'}).find('span', {'class': 'itrPriceVal'})
+        if price_span:
+            currency = price_span.get('title', '').strip()
+            price_value = price_span.find_all('div')[-1].get_text(strip=True)
+            price = f"{currency} {price_value}"
+        else:
+            price = None
+        flights.append({
+            'airline_name': airline_name,
+            'departure_arrival': departure_arrival,
+            'departure_time': departure_time,
+            'journey_duration': journey_duration,
+            'price': price
+        })
+    return flights
+
+# The hotel loop as it was before listing_parser
+def legacy_parse_hotels(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    property_cards = soup.find_all('div', {'data-testid': 'property-card'})
+    hotels = []
+    for card in property_cards:
+        hotel_name = card.find('div', {'data-testid': 'title'}).get_text(strip=True) if card.find('div', {'data-testid': 'title'}) else None
+        location = card.find('span', {'data-testid': 'address'}).get_text(strip=True) if card.find('span', {'data-testid': 'address'}) else None
+        distance = card.find('span', {'data-testid': 'distance'}).get_text(strip=True) if card.find('span', {'data-testid': 'distance'}) else None
+        review_score_div = card.find('div', {'data-testid': 'review-score'})
+        review_score = review_score_div.find('div', class_='ac4a7896c7').get_text(strip=True).replace('Scored', '').strip() if review_score_div else None
+        review_rating = review_score_div.find('div', class_='cb2cbb3ccb').get_text(strip=True) if review_score_div else None
+        reviews = review_score_div.find('div', class_='abf093bdfe').get_text(strip=True) if review_score_div else None
+        hotels.append({
+            'hotel_name': hotel_name,
+            'location': location,
+            'distance': distance,
+            'review_score': review_score,
+            'review_rating': review_rating,
+            'reviews': reviews
+        })
+    return hotels
+
+# Real result pages saved by benchmarks/capture_pages.py
+PAGES_DIR = os.path.join(os.path.dirname(__file__), 'data', 'pages')
+
+def _saved_pages(directory):
+    pages = {'flights': [], 'hotels': []}
+    for kind in pages:
+        for path in sorted(glob.glob(os.path.join(directory, f"{kind}*.html"))):
+            with open(path, encoding='utf-8') as f:
+                pages[kind].append(f.read())
+    return pages
+
+# Pages from `directory`; without one, the saved fixtures, falling back to a synthetic page of
+# `cards` cards for a kind that has none
+def load_pages(directory, cards):
+    if directory:
+        return _saved_pages(directory)
+    pages = _saved_pages(PAGES_DIR)
+    synthetic = {'flights': flight_page, 'hotels': hotel_page}
+    for kind, make_page in synthetic.items():
+        if not pages[kind]:
+            print(f"{kind}: no saved pages in {PAGES_DIR}, using a synthetic page")
+            pages[kind] = [make_page(cards)]
+    return pages
+
+def time_parser(parse, pages, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in pages:
+            parse(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the compiled listing parser with the original BeautifulSoup loops")
+    parser.add_argument('--pages', help="directory with saved flights*.html / hotels*.html result pages")
+    parser.add_argument('--cards', type=int, default=120, help="cards per synthetic page, where no saved pages exist")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages, args.cards)
+    parsers = {
+        'flights': (legacy_parse_flights, parse_flights),
+        'hotels': (legacy_parse_hotels, parse_hotels)
+    }
+
+    for kind, (legacy, compiled) in parsers.items():
+        if not pages[kind]:
+            continue
+        # Both parsers must agree before their timings mean anything
+        for html in pages[kind]:
+            expected = legacy(html)
+            listings = compiled(html)
+            if len(listings) != len(expected):
+                raise SystemExit(f"{kind}: compiled parser found {len(listings)} listings, the BeautifulSoup loop {len(expected)}")
+            actual = [{key: listing[key] for key in expected_listing} for listing, expected_listing in zip(listings, expected)]
+            if actual != expected:
+                raise SystemExit(f"{kind}: compiled parser output differs from the BeautifulSoup loop")
+        legacy_time = time_parser(legacy, pages[kind], args.repeat)
+        compiled_time = time_parser(compiled, pages[kind], args.repeat)
+        print(f"{kind:8s} pages={len(pages[kind])} legacy={legacy_time * 1000:8.2f}ms "
+              f"compiled={compiled_time * 1000:8.2f}ms speedup={legacy_time / compiled_time:5.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# End-to-end benchmark of the plan pipeline, fully offline: saved result pages (or synthetic ones
+# where none were captured, see benchmarks/capture_pages.py) go through the scraper parsers, and recorded Groq and DuckDuckGo responses are replayed through run_travel_planner and
+# get_chat_response (see benchmarks/offline.py).
+#
+#   python -m benchmarks.bench_pipeline                      # compare with benchmarks/data/baseline.json
+#   python -m benchmarks.bench_pipeline --save-baseline --baseline .bench_baseline.json
+#   python -m benchmarks.bench_pipeline --baseline .bench_baseline.json --timings
+#   python -m benchmarks.bench_pipeline --stages plan_parallel plan_sequential --latency-scale 1
+#
+# Exits with status 1 when a stage regressed by more than --tolerance against the baseline. The
+# committed baseline only gates items and peak memory; timings depend on the machine, so compare
+# them (--timings) against a baseline saved on the same machine, and re-save it after capturing
+# new result pages.
+import argparse
+import contextlib
+import io
+import os
+import sys
+from benchmarks import harness, offline
+from benchmarks.bench_parsers import load_pages
+from benchmarks.bench_slot_filler import CORPUS_PATH, CORPUS_TODAY, load_corpus
+
+BASELINE_PATH = os.path.join(offline.DATA_DIR, 'baseline.json')
+
+# The persona the recorded LLM responses were captured for
+PERSONA = ("A family of four from Singapore visiting Vietnam for two weeks in March on a mid-range budget, "
+           "interested in food and history")
+# One message needing the LLM, then one the local slot filler answers
+CHAT_TURNS = [
+    "We're a family from Singapore, 2 adults and 2 kids, thinking about Vietnam",
+    "2 rooms"
+]
+
+# Each stage returns (fn, items per call); imports happen here so unused stages cost nothing
+def parser_stages(pages):
+    from Flights_Scrapper import parse_flights
+    from Hotels_Scrapper import parse_hotels
+    from listing_records import FlightTable, HotelTable
+
+    flight_count = sum(len(parse_flights(html)) for html in pages['flights'])
+    hotel_count = sum(len(parse_hotels(html)) for html in pages['hotels'])
+
+    def tables():
+        FlightTable.from_listings([flight for html in pages['flights'] for flight in parse_flights(html)]).cheapest()
+        HotelTable.from_listings([hotel for html in pages['hotels'] for hotel in parse_hotels(html)]).best_rated()
+
+    return {
+        'parse_flights': (lambda: [parse_flights(html) for html in pages['flights']], flight_count),
+        'parse_hotels': (lambda: [parse_hotels(html) for html in pages['hotels']], hotel_count),
+        'listing_tables': (tables, flight_count + hotel_count)
+    }
+
+def slot_filler_stage():
+    from slot_filler import extract_slots
+    corpus = load_corpus(CORPUS_PATH)
+
+    def run():
+        for example in corpus:
+            extract_slots(example['text'], today=CORPUS_TODAY, current=example.get('current'))
+
+    return {'slot_filler': (run, len(corpus))}
+
+def chat_stage():
+    import UserInput
+    # UserInput only touches st.session_state, so a plain dict-backed stand-in is enough
+    UserInput.st = offline.BareStreamlit()
+
+    def run():
+        UserInput.st.session_state.clear()
+        UserInput.initialize_session_state()
+        for message in CHAT_TURNS:
+            _, new_params = UserInput.get_chat_response(message)
+            UserInput.update_parameters(new_params)
+
+    return {'chat_turn': (run, len(CHAT_TURNS))}
+
+def plan_stages():
+    import app
+
+    # Plan and task caches are off: each iteration must run every agent
+    return {
+        'plan_parallel': (lambda: app.run_travel_planner(PERSONA, use_cache=False), 1),
+        'plan_sequential': (lambda: app.run_travel_planner(PERSONA, parallel=False, use_cache=False), 1)
+    }
+
+STAGE_GROUPS = {
+    'parse_flights': 'parsers', 'parse_hotels': 'parsers', 'listing_tables': 'parsers',
+    'slot_filler': 'slot_filler', 'chat_turn': 'chat',
+    'plan_parallel': 'plan', 'plan_sequential': 'plan'
+}
+
+def build_stages(names, pages):
+    groups = {STAGE_GROUPS[name] for name in names}
+    stages = {}
+    if 'parsers' in groups:
+        stages.update(parser_stages(pages))
+    if 'slot_filler' in groups:
+        stages.update(slot_filler_stage())
+    if 'chat' in groups:
+        stages.update(chat_stage())
+    if 'plan' in groups:
+        stages.update(plan_stages())
+    return {name: stages[name] for name in names}
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the plan pipeline")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGE_GROUPS), default=list(STAGE_GROUPS))
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--pages', help="directory with saved flights*.html / hotels*.html result pages")
+    parser.add_argument('--cards', type=int, default=120, help="cards per synthetic page, where no saved pages exist")
+    parser.add_argument('--latency-scale', type=float, default=0.1,
+                        help="multiplier for the recorded LLM and search latencies (1 replays them in real time)")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=harness.DEFAULT_TOLERANCE)
+    parser.add_argument('--timings', action='store_true', help="also compare latency and throughput")
+    args = parser.parse_args()
+
+    # Before anything builds a model or a search tool
+    offline.install(latency_scale=args.latency_scale)
+    stages = build_stages(args.stages, load_pages(args.pages, args.cards))
+
+    results = {}
+    for name, (fn, items) in stages.items():
+        # Agents print their reasoning; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = harness.measure(fn, iterations=args.iterations, items=items)
+    harness.print_results(results)
+
+    if args.save_baseline:
+        harness.save_baseline(args.baseline, results)
+        print(f"\nSaved baseline to {args.baseline}")
+        return
+
+    baseline = harness.load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one")
+        return
+    if harness.compare(results, baseline, args.tolerance, args.timings):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
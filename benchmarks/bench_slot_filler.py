@@ -0,0 +1,85 @@
+# Accuracy and latency of the local slot filler on a corpus of sample utterances.
+#
+#   python -m benchmarks.bench_slot_filler
+#   python -m benchmarks.bench_slot_filler --corpus my_utterances.jsonl --verbose
+#
+# Each corpus line has "text", "expected" slots, optional "current" slots and "local":
+# whether the message should be answered without the LLM.
+import argparse
+import json
+import os
+import statistics
+import time
+from collections import Counter
+from datetime import date
+from slot_filler import extract_slots
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'slot_utterances.jsonl')
+# Relative dates in the corpus are resolved against this day
+CORPUS_TODAY = date(2024, 10, 1)
+
+def load_corpus(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy and latency of the local slot filler")
+    parser.add_argument('--corpus', default=CORPUS_PATH)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    true_pos, false_pos, false_neg = Counter(), Counter(), Counter()
+    exact = local_hits = local_expected = wrong_local = 0
+    latencies = []
+
+    for sample in corpus:
+        current = sample.get('current', {})
+        result = extract_slots(sample['text'], today=CORPUS_TODAY, current=current)
+        expected = sample['expected']
+
+        for slot, value in result.slots.items():
+            if expected.get(slot) == value:
+                true_pos[slot] += 1
+            else:
+                false_pos[slot] += 1
+        for slot in expected:
+            if result.slots.get(slot) != expected[slot]:
+                false_neg[slot] += 1
+
+        exact += result.slots == expected
+        local_expected += sample['local']
+        local_hits += result.fully_resolved and sample['local']
+        # Skipping the LLM with the wrong slots is the costly mistake
+        wrong_local += result.fully_resolved and result.slots != expected
+
+        if args.verbose and (result.slots != expected or result.fully_resolved != sample['local']):
+            print(f"MISMATCH {sample['text']!r}\n  got      {result.slots} resolved={result.fully_resolved} "
+                  f"ambiguous={sorted(result.ambiguous)} residual={result.residual}\n  expected {expected} local={sample['local']}")
+
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            extract_slots(sample['text'], today=CORPUS_TODAY, current=current)
+            latencies.append(time.perf_counter() - start)
+
+    print(f"{'slot':16s} {'precision':>9s} {'recall':>7s}")
+    for slot in sorted(set(true_pos) | set(false_pos) | set(false_neg)):
+        predicted = true_pos[slot] + false_pos[slot]
+        relevant = true_pos[slot] + false_neg[slot]
+        precision = true_pos[slot] / predicted if predicted else 1.0
+        recall = true_pos[slot] / relevant if relevant else 1.0
+        print(f"{slot:16s} {precision:9.2f} {recall:7.2f}")
+
+    print(f"\nutterances         {len(corpus)}")
+    print(f"exact slot match   {exact / len(corpus):.2%}")
+    print(f"LLM skipped        {local_hits}/{local_expected} of fully local utterances")
+    print(f"wrong LLM skips    {wrong_local}")
+    print(f"latency p50/p95    {statistics.median(latencies) * 1e6:.0f}us / {percentile(latencies, 95) * 1e6:.0f}us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Import time and first-use cost of the app modules, each measured in a fresh interpreter.
+#
+#   python -m benchmarks.bench_startup
+#   python -m benchmarks.bench_startup --modules app UserInput --importtime
+import argparse
+import statistics
+import subprocess
+import sys
+
+MODULES = ['extraction_tool', 'UserInput', 'app', 'slot_filler', 'Flights_Scrapper', 'Hotels_Scrapper']
+
+# Resources built lazily after import, timed separately as "first use"
+FIRST_USE = {
+    'extraction_tool': 'extraction_tool.extract_travel_info("from Paris to Rome in May")',
+    'app': 'app.build_agents()',
+    'UserInput': 'resources.get_llm(0.7)'
+}
+
+SCRIPT = '''
+import time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+{first_use}
+print(imported - start, time.perf_counter() - imported)
+'''
+
+def measure(module, first_use):
+    code = SCRIPT.format(module=module, first_use=f"import resources\n{first_use}" if first_use else '')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+    import_time, first_use_time = map(float, result.stdout.split()[-2:])
+    return (import_time, first_use_time), None
+
+# Largest cumulative entries from `python -X importtime`
+def import_profile(module, top):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[1].isdigit():
+            rows.append((int(parts[1]), parts[2]))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and first-use cost of the app modules")
+    parser.add_argument('--modules', nargs='+', default=MODULES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--first-use', action='store_true', help="also time building models, tools and agents")
+    parser.add_argument('--importtime', action='store_true', help="show the slowest imports per module")
+    args = parser.parse_args()
+
+    print(f"{'module':18s} {'import':>10s} {'first use':>10s}")
+    for module in args.modules:
+        first_use = FIRST_USE.get(module) if args.first_use else None
+        samples = []
+        for _ in range(args.repeat):
+            sample, error = measure(module, first_use)
+            if error:
+                print(f"{module:18s} failed: {error}")
+                break
+            samples.append(sample)
+        if not samples:
+            continue
+        import_time = statistics.median(s[0] for s in samples)
+        first_use_time = statistics.median(s[1] for s in samples)
+        print(f"{module:18s} {import_time * 1000:8.1f}ms {first_use_time * 1000:8.1f}ms")
+        if args.importtime:
+            for cumulative, name in import_profile(module, 10):
+                print(f"    {cumulative / 1000:8.1f}ms  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Save live Bing flights and Booking.com result pages as benchmark fixtures, so the parser stages
+# run on real markup instead of the synthetic pages. Needs network access and a crawl4ai browser.
+#
+#   python -m benchmarks.capture_pages
+#   python -m benchmarks.capture_pages --ddate 2025-03-10 --rdate 2025-03-24
+#
+# Pages are written to benchmarks/data/pages/flights_<src>_<des>.html and
+# hotels_<destination>.html, which bench_parsers and bench_pipeline pick up by default.
+import argparse
+import asyncio
+import os
+from datetime import date, timedelta
+from browser_pool import BrowserPool
+from Flights_Scrapper import build_bing_url, parse_flights
+from Hotels_Scrapper import build_booking_url, parse_hotels
+from listing_stream import LOAD_MORE_JS
+from benchmarks.bench_parsers import PAGES_DIR
+
+ROUTES = [('sin', 'han'), ('sin', 'blr'), ('jfk', 'lhr')]
+DESTINATIONS = ['Hanoi', 'Ho Chi Minh City', 'Bangkok']
+
+async def capture(pool, url, path, parse):
+    async with pool.crawler() as crawler:
+        result = await crawler.arun(url=url, js_code=[LOAD_MORE_JS], css_selector="", bypass_cache=True)
+    listings = parse(result.html) if result.success else []
+    # A blocked or empty render would make a useless fixture
+    if not listings:
+        print(f"skipped {path}: no listings parsed")
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(result.html)
+    print(f"saved {path}: {len(listings)} listings")
+
+async def main():
+    start = date.today() + timedelta(days=30)
+    parser = argparse.ArgumentParser(description="Save live result pages as benchmark fixtures")
+    parser.add_argument('--ddate', default=start.isoformat())
+    parser.add_argument('--rdate', default=(start + timedelta(days=7)).isoformat())
+    args = parser.parse_args()
+
+    os.makedirs(PAGES_DIR, exist_ok=True)
+    async with BrowserPool(size=2) as pool:
+        await asyncio.gather(
+            *(
+                capture(pool, build_bing_url(src, des, args.ddate, args.rdate, 1, 0, 0),
+                        os.path.join(PAGES_DIR, f"flights_{src}_{des}.html"), parse_flights)
+                for src, des in ROUTES
+            ),
+            *(
+                capture(pool, build_booking_url(destination, args.ddate, args.rdate, 2, 1, 0, 0),
+                        os.path.join(PAGES_DIR, f"hotels_{destination.lower().replace(' ', '_')}.html"), parse_hotels)
+                for destination in DESTINATIONS
+            )
+        )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+# Shared measurement for the benchmark scripts: latency percentiles, throughput, and memory per
+# stage, plus comparison against a saved baseline.
+import json
+import math
+import time
+import tracemalloc
+
+# Relative change before a metric counts as a regression
+DEFAULT_TOLERANCE = 0.15
+
+# Direction in which each metric gets worse. Items and peak memory come out the same on any
+# machine, so a shared baseline can gate them; timings only mean something against a baseline
+# recorded on the same machine.
+STABLE_METRICS = {'items': -1, 'peak_kib': 1}
+TIMING_METRICS = {'p50_ms': 1, 'p95_ms': 1, 'throughput': -1}
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+# Run `fn` `iterations` times after `warmup` untimed calls. `items` is how many units of work
+# (pages, utterances, plans) one call processes. Memory is measured in one extra traced call so
+# tracemalloc's overhead doesn't distort the timings.
+def measure(fn, iterations=10, warmup=1, items=1):
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        # Blocks allocated during the call that are still alive afterwards. This is not a count of
+        # every allocation made: tracemalloc only sees blocks that are live at the snapshot.
+        retained_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'items': items,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'throughput': items * iterations / sum(latencies),
+        'peak_kib': peak / 1024,
+        'retained_blocks': retained_blocks
+    }
+
+def print_results(results):
+    print(f"{'stage':18s} {'p50':>10s} {'p95':>10s} {'items/s':>10s} {'peak':>11s} {'retained_blocks':>16s}")
+    for stage, result in results.items():
+        print(f"{stage:18s} {result['p50_ms']:8.2f}ms {result['p95_ms']:8.2f}ms {result['throughput']:10.1f} "
+              f"{result['peak_kib']:8.1f}KiB {result['retained_blocks']:16d}")
+
+def load_baseline(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_baseline(path, results):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+# Print the change of each metric against the baseline; returns the regressed (stage, metric) pairs
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, timings=False):
+    metrics = {**STABLE_METRICS, **TIMING_METRICS} if timings else STABLE_METRICS
+    regressions = []
+    print(f"\n{'stage':18s} {'metric':12s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for stage, result in results.items():
+        if stage not in baseline:
+            continue
+        for metric, direction in metrics.items():
+            before, after = baseline[stage][metric], result[metric]
+            if not before:
+                continue
+            change = after / before - 1
+            regressed = change * direction > tolerance
+            if regressed:
+                regressions.append((stage, metric))
+            print(f"{stage:18s} {metric:12s} {before:12.2f} {after:12.2f} {change:+7.0%}{'  REGRESSION' if regressed else ''}")
+    return regressions
@@ -0,0 +1,89 @@
+# Offline stand-ins for the Groq chat model and the DuckDuckGo search tool that replay recorded
+# responses, so the whole plan pipeline can be benchmarked without network access or API keys.
+#
+# `install()` must run before the first get_llm()/get_search_tool() call: it swaps the classes
+# resources.py imports, so every agent, tool and chat turn picks up the replay versions.
+import json
+import os
+import time
+from typing import Any, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain.tools import BaseTool
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+LLM_FIXTURES = os.path.join(DATA_DIR, 'recorded_llm.jsonl')
+SEARCH_FIXTURES = os.path.join(DATA_DIR, 'recorded_search.jsonl')
+
+# Recorded exchanges, one JSON object per line: {"match": [...], "response": "...", "latency": seconds}.
+# The first entry whose `match` strings all occur in the prompt answers it; an entry with no
+# `match` is the fallback.
+class Recording:
+    def __init__(self, path, latency_scale=1.0):
+        self.latency_scale = latency_scale
+        self.calls = 0
+        with open(path, encoding='utf-8') as f:
+            self.entries = [json.loads(line) for line in f if line.strip()]
+
+    def replay(self, prompt):
+        self.calls += 1
+        for entry in self.entries:
+            if all(text in prompt for text in entry.get('match', [])):
+                time.sleep(entry.get('latency', 0.0) * self.latency_scale)
+                return entry['response']
+        raise KeyError(f"No recorded response for prompt: {prompt[:120]!r}")
+
+def _prompt_text(messages):
+    return "\n".join(str(message.content) for message in messages)
+
+class ReplayChatModel(BaseChatModel):
+    recording: Any
+    temperature: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "replay"
+
+    def _generate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs):
+        content = self.recording.replay(_prompt_text(messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    # Word-sized chunks, like a streaming API
+    def _stream(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs):
+        content = self.recording.replay(_prompt_text(messages))
+        for index in range(0, len(content), 24):
+            chunk = content[index:index + 24]
+            if run_manager:
+                run_manager.on_llm_new_token(chunk)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+class ReplaySearchRun(BaseTool):
+    name: str = "duckduckgo_search"
+    description: str = "A wrapper around DuckDuckGo Search. Input should be a search query."
+    recording: Any
+
+    def _run(self, query: str, **kwargs) -> str:
+        return self.recording.replay(query)
+
+def install(llm_fixtures=LLM_FIXTURES, search_fixtures=SEARCH_FIXTURES, latency_scale=1.0):
+    llm_recording = Recording(llm_fixtures, latency_scale)
+    search_recording = Recording(search_fixtures, latency_scale)
+
+    def ChatGroq(temperature=0.0, groq_api_key=None, model_name=None):
+        return ReplayChatModel(recording=llm_recording, temperature=temperature)
+
+    import langchain_groq
+    import langchain_community.tools
+    langchain_groq.ChatGroq = ChatGroq
+    langchain_community.tools.DuckDuckGoSearchRun = lambda: ReplaySearchRun(recording=search_recording)
+    return llm_recording, search_recording
+
+# Dict-backed stand-in for st.session_state, which doesn't keep values outside `streamlit run`
+class SessionState(dict):
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+class BareStreamlit:
+    def __init__(self):
+        self.session_state = SessionState()
@@ -0,0 +1,60 @@
+import random
+
+AIRLINES = ['Singapore Airlines', 'IndiGo', 'Air India', 'Scoot', 'Vistara', 'Malaysia Airlines', 'Thai AirAsia']
+HOTEL_WORDS = ['Grand', 'Riverside', 'Saigon', 'Boutique', 'Palace', 'Central', 'Garden', 'Harbour', 'Old Quarter', 'Lotus']
+RATINGS = ['Exceptional', 'Wonderful', 'Fabulous', 'Very Good', 'Good']
+
+# Page chrome that isn't part of any card, so parsers pay for walking a realistically sized document
+def _noise(rng, blocks):
+    return ''.join(
+        f'<div class="nav-block n{i}"><ul>' + ''.join(f'<li><a href="/p/{rng.randint(0, 10000)}">link {j}</a></li>' for j in range(8)) + '</ul></div>'
+        for i in range(blocks)
+    )
+
+def _flight_card(rng):
+    airline = rng.choice(AIRLINES)
+    hour = rng.randint(0, 22)
+    hours, minutes = rng.randint(3, 18), rng.choice([0, 5, 15, 30, 45, 55])
+    return (
+        '<div class="itrCard itrSummaryCard fbPreventScroll">'
+        '<div class="itrTxtPair airlinePair">'
+        f'<span>SIN - BLR</span><div class="bt_focusText"><div><img alt=""/><div>{airline}</div></div></div>'
+        '</div>'
+        '<div class="itrTxtPair durationPair">'
+        f'<span>{hour:02d}:{rng.choice(["05", "20", "45"])} - {(hour + hours) % 24:02d}:10</span><span>{hours}h {minutes}m</span>'
+        f'<span>{rng.choice(["Nonstop", "1 stop", "2 stops"])}</span>'
+        '</div>'
+        '<div class="itrTxtPair pricePair">'
+        f'<span class="itrPriceVal" title="SGD"><div>S$</div><div>{rng.randint(150, 2400):,}</div></span>'
+        '</div>'
+        '</div>'
+    )
+
+def _hotel_card(rng):
+    name = f"{rng.choice(HOTEL_WORDS)} {rng.choice(HOTEL_WORDS)} Hotel"
+    reviews = rng.randint(5, 9000)
+    return (
+        '<div data-testid="property-card"><div class="c1">'
+        f'<div data-testid="title" class="f6431b446c">{name}</div>'
+        f'<span data-testid="address">District {rng.randint(1, 12)}, Ho Chi Minh City</span>'
+        f'<span data-testid="distance">{rng.uniform(0.1, 9.5):.1f} km from centre</span>'
+        f'<span data-testid="price-and-discounted-price">VND {rng.randint(400, 9000) * 1000:,}</span>'
+        '<div data-testid="review-score">'
+        f'<div class="ac4a7896c7" aria-hidden="true">Scored {rng.uniform(6.0, 9.9):.1f}</div>'
+        f'<div class="d0522b0cca"><div class="cb2cbb3ccb">{rng.choice(RATINGS)}</div><div class="abf093bdfe">{reviews:,} reviews</div></div>'
+        '</div>'
+        '</div></div>'
+    )
+
+def _page(cards, noise):
+    return f'<!DOCTYPE html><html><head><title>Results</title></head><body>{noise}<main>{"".join(cards)}</main>{noise}</body></html>'
+
+# Synthetic Bing flights result page with `count` cards
+def flight_page(count=60, seed=0):
+    rng = random.Random(seed)
+    return _page([_flight_card(rng) for _ in range(count)], _noise(rng, 40))
+
+# Synthetic Booking.com result page with `count` property cards
+def hotel_page(count=60, seed=0):
+    rng = random.Random(seed)
+    return _page([_hotel_card(rng) for _ in range(count)], _noise(rng, 40))
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import time
+import weakref
+from contextlib import asynccontextmanager
+from crawl4ai import AsyncWebCrawler
+from resources import close_with_loop
+
+# Pool settings
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "4"))
+MAX_PAGES_PER_BROWSER = int(os.getenv("BROWSER_MAX_PAGES", "50"))
+MAX_IDLE_SECONDS = float(os.getenv("BROWSER_MAX_IDLE_SECONDS", "300"))
+
+# What a borrower gets: the crawler itself, except that every render through arun is counted,
+# including each "Load More" increment of a streaming crawl
+class PooledCrawler:
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.pages = 0
+        self.failed = False
+        self.last_used = time.monotonic()
+
+    async def arun(self, *args, **kwargs):
+        self.pages += 1
+        return await self.crawler.arun(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.crawler, name)
+
+    # A crawler is reusable while its browser is still connected and it hasn't served too many pages
+    def is_healthy(self, max_pages, max_idle):
+        if self.failed or self.pages >= max_pages:
+            return False
+        if time.monotonic() - self.last_used > max_idle:
+            return False
+        browser = getattr(self.crawler.crawler_strategy, 'browser', None)
+        if browser is not None and not browser.is_connected():
+            return False
+        return True
+
+# Long-lived set of started crawlers shared by every scraper call on one event loop. The browsers
+# are stopped when that loop shuts down (asyncio.run returning), or on leaving `async with pool:`.
+class BrowserPool:
+    def __init__(self, size=POOL_SIZE, max_pages=MAX_PAGES_PER_BROWSER, max_idle=MAX_IDLE_SECONDS, crawler_factory=None):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_idle = max_idle
+        self.crawler_factory = crawler_factory or (lambda: AsyncWebCrawler(verbose=True))
+        self._semaphore = asyncio.Semaphore(size)
+        self._idle = []
+        self._closed = False
+        self._closes_with_loop = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _start(self):
+        crawler = self.crawler_factory()
+        await crawler.__aenter__()
+        return PooledCrawler(crawler)
+
+    async def _stop(self, entry):
+        try:
+            await entry.crawler.__aexit__(None, None, None)
+        except Exception:
+            # The browser may already be gone; nothing else to release
+            pass
+
+    async def _acquire(self):
+        while self._idle:
+            entry = self._idle.pop()
+            if entry.is_healthy(self.max_pages, self.max_idle):
+                return entry
+            await self._stop(entry)
+        return await self._start()
+
+    async def _release(self, entry):
+        entry.last_used = time.monotonic()
+        if self._closed or not entry.is_healthy(self.max_pages, self.max_idle):
+            await self._stop(entry)
+        else:
+            self._idle.append(entry)
+
+    # Borrow a started crawler; at most `size` are in use at once
+    @asynccontextmanager
+    async def crawler(self):
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        if not self._closes_with_loop:
+            self._closes_with_loop = True
+            await close_with_loop(self.close)
+        await self._semaphore.acquire()
+        entry = None
+        try:
+            entry = await self._acquire()
+            yield entry
+        except Exception:
+            # Recycle the browser after any error raised while it was borrowed
+            if entry is not None:
+                entry.failed = True
+            raise
+        finally:
+            if entry is not None:
+                await self._release(entry)
+            self._semaphore.release()
+
+    async def close(self):
+        if _default_pools.get(asyncio.get_running_loop()) is self:
+            del _default_pools[asyncio.get_running_loop()]
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for entry in idle:
+            await self._stop(entry)
+
+# One default pool per event loop, since browsers can't be shared across loops
+_default_pools = weakref.WeakKeyDictionary()
+
+def get_default_pool():
+    loop = asyncio.get_running_loop()
+    pool = _default_pools.get(loop)
+    if pool is None:
+        pool = BrowserPool()
+        _default_pools[loop] = pool
+    return pool
+
+async def close_default_pool():
+    pool = _default_pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
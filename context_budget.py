@@ -0,0 +1,128 @@
+import math
+import os
+import re
+from telemetry import increment
+
+# Budget for the specialist findings handed to the summary writer
+SUMMARY_CONTEXT_TOKENS = int(os.getenv("SUMMARY_CONTEXT_TOKENS", "1200"))
+# Longer facts are cut at a word boundary so one rambling line can't take a whole share
+MAX_FACT_TOKENS = int(os.getenv("SUMMARY_MAX_FACT_TOKENS", "60"))
+# Facts sharing this much of their vocabulary with one already kept are dropped
+DUPLICATE_SIMILARITY = 0.7
+
+# What each specialist contributes, and the words that mark its most useful facts
+CATEGORIES = {
+    'Sight Suggester': ('Sights', r"museum|temple|park|market|tour|beach|palace|old town|old quarter|cruise|hike|food|history"),
+    'Transport Planner': ('Transport', r"fly|flight|train|bus|ferry|taxi|grab|uber|car|drive|metro|transfer|\d+\s*h|hours?|minutes?"),
+    'Accommodation Finder': ('Stays', r"hotel|hostel|resort|airbnb|apartment|homestay|guesthouse|room|night|camp"),
+    'Legal Advisor': ('Legal requirements', r"visa|passport|permit|insurance|vaccin|customs|entry|valid|licen[cs]e|law|prohibit")
+}
+
+PRICE = re.compile(r"[$€£₹]\s?\d|\d\s?(?:usd|eur|gbp|sgd|vnd|inr)\b|\b(?:usd|eur|gbp|sgd|vnd|inr)\s?\d", re.IGNORECASE)
+NUMBER = re.compile(r"\d")
+PROPER_NOUN = re.compile(r"(?<!^)(?<![.!?]\s)\b[A-Z][a-z]+")
+# Agent scaffolding and filler that carry no facts
+SCAFFOLDING = re.compile(r"^(?:thought:.*?(?:final answer:|$)|final answer:|observation:|action(?: input)?:.*$)\s*", re.IGNORECASE)
+FILLER = re.compile(
+    r"^(?:here (?:are|is)|i (?:hope|recommend considering|would suggest)|let me know|overall,|in summary|"
+    r"please note that|feel free|enjoy your|have a (?:great|wonderful))",
+    re.IGNORECASE
+)
+STOPWORDS = set("""
+a an and are as at be by can for from has have in is it its of on or that the their there this to was were will with you your
+""".split())
+
+# Rough count for Mixtral-style tokenizers: about four characters per token
+def estimate_tokens(text):
+    return math.ceil(len(text) / 4)
+
+def _words(text):
+    return set(re.findall(r"[a-z0-9]+", text.lower())) - STOPWORDS
+
+def _truncate(fact, max_tokens):
+    if estimate_tokens(fact) <= max_tokens:
+        return fact
+    return fact[:max_tokens * 4].rsplit(' ', 1)[0].rstrip(',;:') + "..."
+
+# Candidate facts of one agent output: list items and sentences, without agent scaffolding,
+# filler, or raw search snippets (which come back "... with ... ellipses ...")
+def split_facts(output):
+    facts = []
+    for line in str(output).splitlines():
+        line = SCAFFOLDING.sub('', line.strip())
+        line = re.sub(r"^(?:[-*•]|\d+[.)])\s*", '', line).strip()
+        if not line or line.count('...') >= 2:
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+(?=[A-Z])", line):
+            sentence = sentence.strip()
+            if len(sentence) >= 12 and not FILLER.match(sentence):
+                facts.append(sentence)
+    return facts
+
+# Prices and numbers first (the summary needs them most), then category keywords and named places
+def score_fact(fact, keywords):
+    return (
+        3 * bool(PRICE.search(fact))
+        + bool(NUMBER.search(fact))
+        + 2 * bool(keywords and re.search(keywords, fact, re.IGNORECASE))
+        + min(len(PROPER_NOUN.findall(fact)), 3) * 0.5
+    )
+
+# Key facts of each specialist, deduplicated across specialists and cut to `budget` tokens.
+# Every category gets an equal share first; what a short category leaves over goes to the others.
+# Returns (context, stats).
+def compact_context(roles, outputs, budget=SUMMARY_CONTEXT_TOKENS, max_fact_tokens=MAX_FACT_TOKENS):
+    sections = []
+    kept_words = []
+    for role, output in zip(roles, outputs):
+        title, keywords = CATEGORIES.get(role, (role, None))
+        candidates = []
+        for position, fact in enumerate(split_facts(output)):
+            fact = _truncate(fact, max_fact_tokens)
+            words = _words(fact)
+            if not words or any(len(words & seen) / len(words | seen) >= DUPLICATE_SIMILARITY for seen in kept_words):
+                continue
+            kept_words.append(words)
+            candidates.append((score_fact(fact, keywords), position, fact))
+        # Best first; ties keep the agent's own order
+        candidates.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+        sections.append((title, candidates, []))
+
+    header_tokens = sum(estimate_tokens(f"{title}:\n") for title, _, _ in sections)
+    remaining = max(budget - header_tokens, 0)
+    open_sections = [section for section in sections if section[1]]
+    pooled = False
+    while open_sections and remaining > 0:
+        # Equal shares first; once nothing fits in a share, sections compete for what is left
+        share = remaining if pooled else max(remaining // len(open_sections), 1)
+        progressed = False
+        for title, candidates, chosen in open_sections:
+            used = 0
+            for candidate in list(candidates):
+                cost = estimate_tokens(candidate[2]) + 1
+                if used + cost <= min(share, remaining):
+                    candidates.remove(candidate)
+                    chosen.append(candidate)
+                    used += cost
+            remaining -= used
+            progressed = progressed or used > 0
+        open_sections = [section for section in open_sections if section[1]]
+        if not progressed:
+            if pooled:
+                break
+            pooled = True
+
+    context = "\n\n".join(
+        f"{title}:\n" + "\n".join(f"- {fact}" for _, _, fact in sorted(chosen, key=lambda candidate: candidate[1]))
+        for title, _, chosen in sections if chosen
+    )
+    raw_tokens = sum(estimate_tokens(str(output)) for output in outputs)
+    stats = {
+        'raw_tokens': raw_tokens,
+        'context_tokens': estimate_tokens(context),
+        'facts_kept': sum(len(chosen) for _, _, chosen in sections),
+        'facts_found': sum(len(chosen) + len(candidates) for _, candidates, chosen in sections)
+    }
+    increment("summary_context_tokens_total", raw_tokens, stage="raw")
+    increment("summary_context_tokens_total", stats['context_tokens'], stage="budgeted")
+    return context, stats
@@ -1,46 +1,77 @@
-import requests
-from bs4 import BeautifulSoup
 import re
-import spacy
-from langchain_community.tools import DuckDuckGoSearchRun
-from langchain_community.tools.wikipedia.tool import WikipediaQueryRun, WikipediaAPIWrapper
 from langchain.tools import BaseTool
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
+from http_client import FetchError, get_http_client
+from listing_parser import Field, ListingSpec, class_is, has_class
+from resources import get_nlp, get_search_tool, get_wikipedia_tool
+from telemetry import span
 
-# 1. Web Search Tool
-search = DuckDuckGoSearchRun()
+# 1. Web Search Tool, 2. Wikipedia Tool, 5. spaCy pipeline
+# Built on first access (e.g. `extraction_tool.search`) rather than at import time
+_LAZY_ATTRIBUTES = {
+    'search': get_search_tool,
+    'wikipedia': get_wikipedia_tool,
+    'nlp': get_nlp
+}
 
-# 2. Wikipedia Tool
-wikipedia_api = WikipediaAPIWrapper()
-wikipedia = WikipediaQueryRun(api_wrapper=wikipedia_api)
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Result cards read by the scraping tools; parsing is shared by the sync and async paths
+MAX_TOOL_RESULTS = 5
+
+HOTEL_CARDS = ListingSpec(
+    cards="//div[@data-testid='property-card']",
+    fields=[
+        Field('hotel_name', ".//div[@data-testid='title']"),
+        Field('price', ".//span[@data-testid='price-and-discounted-price']")
+    ]
+)
+
+FLIGHT_CARDS = ListingSpec(
+    cards=f"//div[{class_is('inner-grid keel-grid')}]",
+    fields=[
+        Field('airline', f".//div[{has_class('bottom')} and @dir='ltr']"),
+        Field('price', f".//div[{has_class('price-text')}]")
+    ]
+)
+
+def build_kayak_url(origin, destination, ddate, rdate=None):
+    return f"https://www.kayak.com/flights/{origin}-{destination}/{ddate}" + (f"/{rdate}" if rdate else "")
+
+# Cards missing a name or price are skipped rather than failing the whole lookup
+def parse_hotel_results(content, limit=MAX_TOOL_RESULTS):
+    with span("parse", site="booking_lite"):
+        hotels = [hotel for hotel in HOTEL_CARDS.parse(content) if hotel['hotel_name'] and hotel['price']]
+    return hotels[:limit]
+
+def parse_flight_results(content, limit=MAX_TOOL_RESULTS):
+    with span("parse", site="kayak"):
+        flights = [flight for flight in FLIGHT_CARDS.parse(content) if flight['airline'] and flight['price']]
+    return flights[:limit]
 
 # 3. Custom Web Scraping Tool for Hotels
 class HotelInfoScraper(BaseTool):
     name = "HotelInfoScraper"
     description = "Scrapes hotel information from a travel website"
 
+    def _url(self, location):
+        return f"https://www.booking.com/searchresults.html?ss={location}"
+
+    def _format(self, content):
+        return "\n".join(f"{hotel['hotel_name']}: {hotel['price']}" for hotel in parse_hotel_results(content))
+
     def _run(self, location: str) -> str:
-        url = f"https://www.booking.com/searchresults.html?ss={location}"
-        headers = {"User-Agent": "Mozilla/5.0"}
-        
-        # Retry mechanism
-        session = requests.Session()
-        retries = Retry(total=5, backoff_factor=1, status_forcelist=[502, 503, 504])
-        session.mount('https://', HTTPAdapter(max_retries=retries))
-        
         try:
-            response = session.get(url, headers=headers)
-            response.raise_for_status()  # Raise HTTPError for bad responses
-            soup = BeautifulSoup(response.content, 'html.parser')
-            hotels = soup.find_all('div', {'data-testid': 'property-card'})
-            results = []
-            for hotel in hotels[:5]:  # Limit to first 5 results
-                name = hotel.find('div', {'data-testid': 'title'}).text.strip()
-                price = hotel.find('span', {'data-testid': 'price-and-discounted-price'}).text.strip()
-                results.append(f"{name}: {price}")
-            return "\n".join(results)
-        except requests.exceptions.RequestException as e:
+            return self._format(get_http_client().get(self._url(location), conditional=True))
+        except FetchError as e:
+            return f"Error fetching hotel information: {e}"
+
+    async def _arun(self, location: str) -> str:
+        try:
+            return self._format(await get_http_client().aget(self._url(location), conditional=True))
+        except FetchError as e:
             return f"Error fetching hotel information: {e}"
 
 # 4. Custom Web Scraping Tool for Flights
@@ -48,35 +79,28 @@ class FlightInfoScraper(BaseTool):
     name = "FlightInfoScraper"
     description = "Scrapes flight information from a travel website"
 
-    def _run(self, route: str) -> str:
+    def _url(self, route):
         origin, destination = route.split(' to ')
-        url = f"https://www.kayak.com/flights/{origin}-{destination}/2023-12-01"
-        headers = {"User-Agent": "Mozilla/5.0"}
-        
-        # Retry mechanism
-        session = requests.Session()
-        retries = Retry(total=5, backoff_factor=1, status_forcelist=[502, 503, 504])
-        session.mount('https://', HTTPAdapter(max_retries=retries))
-        
+        return build_kayak_url(origin, destination, "2023-12-01")
+
+    def _format(self, content):
+        return "\n".join(f"{flight['airline']}: {flight['price']}" for flight in parse_flight_results(content))
+
+    def _run(self, route: str) -> str:
         try:
-            response = session.get(url, headers=headers)
-            response.raise_for_status()  # Raise HTTPError for bad responses
-            soup = BeautifulSoup(response.content, 'html.parser')
-            flights = soup.find_all('div', class_='inner-grid keel-grid')
-            results = []
-            for flight in flights[:5]:  # Limit to first 5 results
-                airline = flight.find('div', {'class': 'bottom', 'dir': 'ltr'}).text.strip()
-                price = flight.find('div', {'class': 'price-text'}).text.strip()
-                results.append(f"{airline}: {price}")
-            return "\n".join(results)
-        except requests.exceptions.RequestException as e:
+            return self._format(get_http_client().get(self._url(route), conditional=True))
+        except FetchError as e:
             return f"Error fetching flight information: {e}"
 
-# 5. Natural Language Processing for Information Extraction
-nlp = spacy.load("en_core_web_sm")
+    async def _arun(self, route: str) -> str:
+        try:
+            return self._format(await get_http_client().aget(self._url(route), conditional=True))
+        except FetchError as e:
+            return f"Error fetching flight information: {e}"
 
+# 5. Natural Language Processing for Information Extraction
 def extract_travel_info(text):
-    doc = nlp(text)
+    doc = get_nlp()(text)
     locations = [ent.text for ent in doc.ents if ent.label_ in ['GPE', 'LOC']]
     dates = [ent.text for ent in doc.ents if ent.label_ == 'DATE']
     return f"Locations: {', '.join(locations)}\nDates: {', '.join(dates)}"
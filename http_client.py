@@ -0,0 +1,178 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from urllib.parse import urlsplit
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from resources import close_with_loop, resource
+from telemetry import span
+
+# Client settings
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "4"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "8"))
+HTTP_MAX_HOSTS = int(os.getenv("HTTP_MAX_HOSTS", "32"))
+VALIDATOR_CACHE_SIZE = 256
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Failures worth another attempt; any other requests/httpx error (bad URL, redirect loop, ...) fails at once
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+class FetchError(Exception):
+    pass
+
+def _host(url):
+    try:
+        return urlsplit(url).netloc
+    except ValueError as e:
+        raise FetchError(f"Invalid URL {url}: {e}") from e
+
+# Full jitter, so concurrent callers that failed together don't retry together
+def backoff_delay(attempt):
+    return random.uniform(0, HTTP_BACKOFF * (2 ** attempt))
+
+# ETag / Last-Modified of recent responses, for If-None-Match / If-Modified-Since revalidation
+class ValidatorCache:
+    def __init__(self, max_entries=VALIDATOR_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def headers(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is None:
+            return {}
+        etag, last_modified, _ = entry
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def content(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            return entry[2] if entry else None
+
+    def store(self, url, response_headers, content):
+        etag = response_headers.get("ETag")
+        last_modified = response_headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self._entries[url] = (etag, last_modified, content)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+# Shared keep-alive client: a pooled requests.Session for sync callers and one httpx.AsyncClient
+# per event loop for async callers, both bounded to HTTP_MAX_PER_HOST connections per host
+class HTTPClient:
+    def __init__(self, timeout=HTTP_TIMEOUT, retries=HTTP_RETRIES, max_per_host=HTTP_MAX_PER_HOST):
+        self.timeout = timeout
+        self.retries = retries
+        self.max_per_host = max_per_host
+        self.validators = ValidatorCache()
+        self.session = requests.Session()
+        # Retries are handled below with jitter; pool_block makes max_per_host a hard limit
+        adapter = HTTPAdapter(pool_connections=HTTP_MAX_HOSTS, pool_maxsize=max_per_host, pool_block=True, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def _headers(self, url, headers, conditional):
+        merged = {**DEFAULT_HEADERS, **(headers or {})}
+        if conditional:
+            merged.update(self.validators.headers(url))
+        return merged
+
+    # Content for a finished response, or None when the status is worth retrying
+    def _content(self, url, status, response_headers, content):
+        if status == 304:
+            cached = self.validators.content(url)
+            if cached is not None:
+                return cached
+        if status in RETRY_STATUSES:
+            return None
+        if status >= 400:
+            raise FetchError(f"{status} error for url: {url}")
+        self.validators.store(url, response_headers, content)
+        return content
+
+    def get(self, url, headers=None, conditional=False):
+        host = _host(url)
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(backoff_delay(attempt - 1))
+            try:
+                with span("http.get", host=host):
+                    response = self.session.get(url, headers=self._headers(url, headers, conditional), timeout=self.timeout)
+            except RETRY_ERRORS as e:
+                error = e
+                continue
+            except requests.RequestException as e:
+                raise FetchError(f"Error fetching {url}: {e}") from e
+            content = self._content(url, response.status_code, response.headers, response.content)
+            if content is not None:
+                return content
+            error = FetchError(f"{response.status_code} error for url: {url}")
+        raise FetchError(f"Giving up on {url} after {self.retries + 1} attempts: {error}") from error
+
+    # The loop's client is closed with the loop, so one-shot asyncio.run callers don't leak connections
+    async def _async_client(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_clients:
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=HTTP_MAX_HOSTS * self.max_per_host, max_keepalive_connections=HTTP_MAX_HOSTS)
+            )
+            self._async_clients[loop] = (client, {})
+            await close_with_loop(self.aclose)
+        return self._async_clients[loop]
+
+    async def aget(self, url, headers=None, conditional=False):
+        client, host_limits = await self._async_client()
+        host = _host(url)
+        if host not in host_limits:
+            host_limits[host] = asyncio.Semaphore(self.max_per_host)
+
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(backoff_delay(attempt - 1))
+            try:
+                async with host_limits[host]:
+                    with span("http.get", host=host):
+                        response = await client.get(url, headers=self._headers(url, headers, conditional))
+            except httpx.UnsupportedProtocol as e:
+                raise FetchError(f"Error fetching {url}: {e}") from e
+            except httpx.TransportError as e:
+                error = e
+                continue
+            except (httpx.HTTPError, httpx.InvalidURL) as e:
+                raise FetchError(f"Error fetching {url}: {e}") from e
+            content = self._content(url, response.status_code, response.headers, response.content)
+            if content is not None:
+                return content
+            error = FetchError(f"{response.status_code} error for url: {url}")
+        raise FetchError(f"Giving up on {url} after {self.retries + 1} attempts: {error}") from error
+
+    async def aclose(self):
+        entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[0].aclose()
+
+@resource
+def get_http_client():
+    return HTTPClient()
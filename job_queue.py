@@ -0,0 +1,249 @@
+import asyncio
+import json
+import os
+import sqlite3
+import socket
+import threading
+import time
+import uuid
+
+# Queue settings
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", ".jobs.sqlite3")
+# Plans run at the same time; each one fans out to its own specialist threads
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Queued plus running jobs accepted before new submissions are turned away
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "20"))
+JOB_MAX_PER_USER = int(os.getenv("JOB_MAX_PER_USER", "1"))
+# Finished jobs are kept this long so a refreshed page can still show the result
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "86400"))
+# A running job belongs to the process holding its lease; a lease not renewed for this long means
+# that process went away and the job may be run again elsewhere
+JOB_LEASE = float(os.getenv("JOB_LEASE", "60"))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+class JobRejected(Exception):
+    pass
+
+# Job state and partial results, readable from any session or process
+class JobStore:
+    def __init__(self, path=JOB_STORE_PATH, retention=JOB_RETENTION):
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, user_id TEXT NOT NULL, prompt TEXT NOT NULL, status TEXT NOT NULL, "
+            "sections TEXT NOT NULL DEFAULT '[]', summary TEXT NOT NULL DEFAULT '', error TEXT, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, owner TEXT, lease_until REAL)"
+        )
+        # Stores created before jobs had owners
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (('owner', 'TEXT'), ('lease_until', 'REAL')):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_user_status ON jobs (user_id, status)")
+        self._conn.commit()
+
+    # Admission control and insert happen under one lock, so limits hold under concurrent submits
+    def create(self, user_id, prompt, max_pending=JOB_MAX_PENDING, max_per_user=JOB_MAX_PER_USER):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            (pending,) = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES).fetchone()
+            if pending >= max_pending:
+                raise JobRejected("The planner is busy right now, please try again in a few minutes.")
+            (own,) = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE user_id = ? AND status IN (?, ?)", (user_id, *ACTIVE_STATUSES)
+            ).fetchone()
+            if own >= max_per_user:
+                raise JobRejected("You already have a plan in progress; wait for it to finish or cancel it.")
+            now = time.time()
+            self._conn.execute(
+                "INSERT INTO jobs (id, user_id, prompt, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, user_id, prompt, QUEUED, now)
+            )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status NOT IN (?, ?) AND finished_at < ?", (*ACTIVE_STATUSES, now - self.retention)
+            )
+            self._conn.commit()
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['sections'] = json.loads(job['sections'])
+        return job
+
+    # Takes a queued job for `owner`; returns False if another worker or process got it first
+    def claim(self, job_id, owner, lease=JOB_LEASE):
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, started_at = ?, lease_until = ? WHERE id = ? AND status = ?",
+                (RUNNING, owner, now, now + lease, job_id, QUEUED)
+            )
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    # Finishes an active job; returns False if it had already finished or been cancelled.
+    # With `owner`, only a running job held by that owner is finished.
+    def set_status(self, job_id, status, error=None, owner=None):
+        sql = "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status IN (?, ?)"
+        params = [status, error, time.time(), job_id, *ACTIVE_STATUSES]
+        if owner is not None:
+            sql += " AND owner = ?"
+            params.append(owner)
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def add_section(self, job_id, role, output):
+        with self._lock:
+            (sections,) = self._conn.execute("SELECT sections FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            sections = json.loads(sections) + [[role, output]]
+            self._conn.execute("UPDATE jobs SET sections = ? WHERE id = ?", (json.dumps(sections, ensure_ascii=False), job_id))
+            self._conn.commit()
+
+    def set_summary(self, job_id, summary):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET summary = ? WHERE id = ?", (summary, job_id))
+            self._conn.commit()
+
+    # Extends the lease of every job `owner` is running; returns the ids it still holds
+    def renew(self, owner, lease=JOB_LEASE):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = ?", (time.time() + lease, owner, RUNNING)
+            )
+            self._conn.commit()
+            rows = self._conn.execute("SELECT id FROM jobs WHERE owner = ? AND status = ?", (owner, RUNNING)).fetchall()
+        return {row['id'] for row in rows}
+
+    # Running jobs whose lease ran out (their process went away) start again from scratch.
+    # Returns every queued job, for a queue to schedule; claim() decides who actually runs each.
+    def requeue_interrupted(self):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, sections = '[]', summary = '', started_at = NULL, owner = NULL, lease_until = NULL "
+                "WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)",
+                (QUEUED, RUNNING, time.time())
+            )
+            self._conn.commit()
+            rows = self._conn.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)).fetchall()
+        return [row['id'] for row in rows]
+
+# What a running job may report back
+class JobContext:
+    def __init__(self, job_id, store, cancel_event):
+        self.job_id = job_id
+        self.store = store
+        self._cancel_event = cancel_event
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def add_section(self, role, output):
+        self.store.add_section(self.job_id, role, output)
+
+    def set_summary(self, summary):
+        self.store.set_summary(self.job_id, summary)
+
+# Runs submitted jobs as asyncio tasks on a dedicated event loop thread, at most `workers` at once.
+# `runner(prompt, context)` is the coroutine doing the work; blocking parts belong in an executor.
+class JobQueue:
+    def __init__(self, runner, store=None, workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING, max_per_user=JOB_MAX_PER_USER,
+                 lease=JOB_LEASE):
+        self.runner = runner
+        self.store = store or JobStore()
+        self.max_pending = max_pending
+        self.max_per_user = max_per_user
+        self.lease = lease
+        # Identifies this queue's jobs among those of other processes sharing the store
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._slots = asyncio.Semaphore(workers)
+        self._tasks = {}
+        self._cancel_events = {}
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="job-queue", daemon=True).start()
+        self._recover()
+        asyncio.run_coroutine_threadsafe(self._heartbeat(), self._loop)
+
+    def submit(self, user_id, prompt):
+        job_id = self.store.create(user_id, prompt, self.max_pending, self.max_per_user)
+        self._schedule(job_id)
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    # Queued jobs never start; running ones stop at their next await or cancellation check.
+    # Agent calls already in flight finish in the background, but their results are dropped.
+    def cancel(self, job_id):
+        if not self.store.set_status(job_id, CANCELLED):
+            return False
+        event = self._cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+        self._loop.call_soon_threadsafe(self._cancel_task, job_id)
+        return True
+
+    def _schedule(self, job_id):
+        if job_id in self._cancel_events:
+            return
+        self._cancel_events[job_id] = threading.Event()
+        self._loop.call_soon_threadsafe(self._start, job_id)
+
+    def _recover(self):
+        for job_id in self.store.requeue_interrupted():
+            self._schedule(job_id)
+
+    # Keeps this queue's leases alive, stops jobs cancelled from another process and picks up
+    # jobs whose process went away
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                held = self.store.renew(self.owner, self.lease)
+                for job_id, task in list(self._tasks.items()):
+                    if job_id not in held and (job := self.store.get(job_id)) and job['status'] == CANCELLED:
+                        self._cancel_events[job_id].set()
+                        task.cancel()
+                self._recover()
+            except sqlite3.Error:
+                pass
+
+    def _start(self, job_id):
+        self._tasks[job_id] = self._loop.create_task(self._run(job_id))
+
+    def _cancel_task(self, job_id):
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+
+    async def _run(self, job_id):
+        try:
+            async with self._slots:
+                if not self.store.claim(job_id, self.owner, self.lease):
+                    return
+                job = self.store.get(job_id)
+                await self.runner(job['prompt'], JobContext(job_id, self.store, self._cancel_events[job_id]))
+                self.store.set_status(job_id, DONE, owner=self.owner)
+        except asyncio.CancelledError:
+            self.store.set_status(job_id, CANCELLED, owner=self.owner)
+        except Exception as e:
+            self.store.set_status(job_id, FAILED, error=str(e), owner=self.owner)
+        finally:
+            self._tasks.pop(job_id, None)
+            self._cancel_events.pop(job_id, None)
@@ -0,0 +1,71 @@
+from lxml import etree, html as lxml_html
+
+# XPath predicate matching one token of a class attribute, like BeautifulSoup's class_= lookups
+def has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+# XPath predicate matching the whole class attribute, like BeautifulSoup's {'class': 'a b'} lookups
+def class_is(value):
+    return f"normalize-space(@class)='{value}'"
+
+# Same result as BeautifulSoup's get_text(strip=True)
+def node_text(node):
+    return ''.join(text.strip() for text in node.itertext())
+
+# One output value: the `index`-th node matched by `path`, as stripped text or an attribute
+class Field:
+    def __init__(self, name, path='.', index=0, attr=None, transform=None):
+        self.name = name
+        self.path = path
+        self.index = index
+        self.attr = attr
+        self.transform = transform
+        self._xpath = etree.XPath(path)
+
+    def extract(self, scope):
+        if scope is None:
+            return None
+        nodes = self._xpath(scope)
+        try:
+            node = nodes[self.index]
+        except IndexError:
+            return None
+        value = node.get(self.attr, '').strip() if self.attr else node_text(node)
+        return self.transform(value) if self.transform else value
+
+# Fields that share a container; the container is located once per card
+class Group:
+    def __init__(self, path, fields):
+        self.path = path
+        self.fields = fields
+        self._xpath = None if path == '.' else etree.XPath(f"({path})[1]")
+
+    def extract(self, card, record):
+        if self._xpath is None:
+            scope = card
+        else:
+            matches = self._xpath(card)
+            scope = matches[0] if matches else None
+        for field in self.fields:
+            record[field.name] = field.extract(scope)
+
+# Declarative description of a result page: which nodes are cards and what to read from each.
+# All XPath expressions are compiled when the spec is built, so parsing is a single walk over the cards.
+class ListingSpec:
+    def __init__(self, cards, fields, post=None):
+        self.fields = [field if isinstance(field, Group) else Group('.', [field]) for field in fields]
+        self.post = post
+        self._cards = etree.XPath(cards)
+
+    # `offset` skips cards already parsed from an earlier render of the same page
+    def parse(self, html, offset=0):
+        if not html or not html.strip():
+            return []
+        document = lxml_html.fromstring(html)
+        listings = []
+        for card in self._cards(document)[offset:]:
+            record = {}
+            for group in self.fields:
+                group.extract(card, record)
+            listings.append(self.post(record) if self.post else record)
+        return listings
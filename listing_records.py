@@ -0,0 +1,178 @@
+import math
+import re
+from dataclasses import astuple, dataclass, fields
+import pandas as pd
+
+NUMBER_PATTERN = re.compile(r'\d[\d,]*(?:\.\d+)?')
+CURRENCY_PATTERN = re.compile(r'^\s*([^\d\s]+)')
+DURATION_PATTERN = re.compile(r'(?:(\d+)\s*(?:h|hr|hrs|hour|hours))?\s*(?:(\d+)\s*(?:m|min|mins|minute|minutes))?', re.IGNORECASE)
+DISTANCE_PATTERN = re.compile(r'(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:[.,]\d+)?)\s*(km|m|mi|miles?)\b', re.IGNORECASE)
+THOUSANDS_PATTERN = re.compile(r'\d{1,3}(?:,\d{3})+(?:\.\d+)?')
+KM_PER_UNIT = {'km': 1.0, 'm': 0.001, 'mi': 1.609344, 'mile': 1.609344, 'miles': 1.609344}
+
+# Scraped text -> numbers. Each returns NaN when the text has nothing usable.
+
+def parse_number(text):
+    match = NUMBER_PATTERN.search(text or '')
+    return float(match.group().replace(',', '')) if match else math.nan
+
+# "SGD 1,234" / "INR ₹12,345" -> ('SGD', 1234.0)
+def parse_price(text):
+    if not text:
+        return None, math.nan
+    match = CURRENCY_PATTERN.match(text)
+    return (match.group(1) if match else None), parse_number(text)
+
+# "4h 5m" / "12 hr" / "45 min" -> minutes
+def parse_duration_minutes(text):
+    for match in DURATION_PATTERN.finditer(text or ''):
+        hours, minutes = match.groups()
+        if hours or minutes:
+            return int(hours or 0) * 60.0 + int(minutes or 0)
+    return math.nan
+
+# "1.2 km from centre" / "1,200 m from centre" / "0,5 km" / "0.5 miles from center" -> kilometres.
+# A comma before exactly three digits groups thousands, any other comma is a decimal point.
+def parse_distance_km(text):
+    match = DISTANCE_PATTERN.search(text or '')
+    if not match:
+        return math.nan
+    value, unit = match.groups()
+    value = value.replace(',', '') if THOUSANDS_PATTERN.fullmatch(value) else value.replace(',', '.')
+    return float(value) * KM_PER_UNIT[unit.lower()]
+
+@dataclass(slots=True)
+class FlightRecord:
+    airline_name: str
+    departure_arrival: str
+    departure_time: str
+    duration_min: float
+    currency: str
+    price: float
+
+    @classmethod
+    def from_listing(cls, listing):
+        currency, price = parse_price(listing.get('price'))
+        return cls(
+            listing.get('airline_name'),
+            listing.get('departure_arrival'),
+            listing.get('departure_time'),
+            parse_duration_minutes(listing.get('journey_duration')),
+            currency,
+            price
+        )
+
+@dataclass(slots=True)
+class HotelRecord:
+    hotel_name: str
+    location: str
+    distance_km: float
+    currency: str
+    price: float
+    review_score: float
+    review_rating: str
+    review_count: float
+
+    @classmethod
+    def from_listing(cls, listing):
+        currency, price = parse_price(listing.get('price'))
+        return cls(
+            listing.get('hotel_name'),
+            listing.get('location'),
+            parse_distance_km(listing.get('distance')),
+            currency,
+            price,
+            parse_number(listing.get('review_score')),
+            listing.get('review_rating'),
+            parse_number(listing.get('reviews'))
+        )
+
+# Column-oriented listings: strings are parsed once on the way in, and ranking works on numeric columns
+class ListingTable:
+    record_type = None
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    @classmethod
+    def columns(cls):
+        return [field.name for field in fields(cls.record_type)]
+
+    # Numeric columns stay float even with no rows, so ranking an empty table returns an empty table
+    @classmethod
+    def _frame(cls, rows):
+        frame = pd.DataFrame(rows, columns=cls.columns())
+        return frame.astype({field.name: float for field in fields(cls.record_type) if field.type is float})
+
+    @classmethod
+    def from_records(cls, records):
+        return cls(cls._frame([astuple(record) for record in records]))
+
+    @classmethod
+    def from_listings(cls, listings):
+        return cls.from_records(cls.record_type.from_listing(listing) for listing in listings)
+
+    # Combine scrape_batch results, keeping each query's parameters as extra columns
+    @classmethod
+    def from_batch(cls, results):
+        frames = []
+        for item in results:
+            if not item.result:
+                continue
+            frame = cls.from_listings(item.result).frame
+            for key, value in item.query.items():
+                frame[key] = value
+            frames.append(frame)
+        if not frames:
+            return cls(cls._frame([]))
+        return cls(pd.concat(frames, ignore_index=True))
+
+    def __len__(self):
+        return len(self.frame)
+
+    # Keyword bounds on numeric columns, e.g. filter(max_price=500, max_duration_min=600).
+    # Rows whose value is missing never satisfy a bound.
+    def filter(self, **bounds):
+        mask = pd.Series(True, index=self.frame.index)
+        for key, value in bounds.items():
+            if value is None:
+                continue
+            kind, _, column = key.partition('_')
+            if column not in self.frame.columns or kind not in ('min', 'max'):
+                raise ValueError(f"Unknown filter: {key}")
+            mask &= self.frame[column] >= value if kind == 'min' else self.frame[column] <= value
+        return type(self)(self.frame[mask])
+
+    def where(self, column, value):
+        return type(self)(self.frame[self.frame[column] == value])
+
+    def top_k(self, by, k=5, ascending=True):
+        ranked = self.frame.dropna(subset=[by])
+        ranked = ranked.nsmallest(k, by) if ascending else ranked.nlargest(k, by)
+        return type(self)(ranked)
+
+    def to_records(self):
+        return [self.record_type(*row) for row in self.frame[self.columns()].itertuples(index=False)]
+
+class FlightTable(ListingTable):
+    record_type = FlightRecord
+
+    # e.g. "cheapest under 10h": cheapest(max_duration_min=600)
+    def cheapest(self, k=5, max_price=None, max_duration_min=None, currency=None):
+        table = self.where('currency', currency) if currency else self
+        return table.filter(max_price=max_price, max_duration_min=max_duration_min).top_k('price', k)
+
+    def fastest(self, k=5, max_price=None):
+        return self.filter(max_price=max_price).top_k('duration_min', k)
+
+class HotelTable(ListingTable):
+    record_type = HotelRecord
+
+    # e.g. "best score within 2 km": best_rated(max_distance_km=2)
+    def best_rated(self, k=5, max_distance_km=None, max_price=None, min_review_count=None):
+        table = self.filter(max_distance_km=max_distance_km, max_price=max_price, min_review_count=min_review_count)
+        return table.top_k('review_score', k, ascending=False)
+
+    def cheapest(self, k=5, max_distance_km=None, min_review_score=None, currency=None):
+        table = self.where('currency', currency) if currency else self
+        return table.filter(max_distance_km=max_distance_km, min_review_score=min_review_score).top_k('price', k)
@@ -0,0 +1,51 @@
+import os
+import uuid
+from telemetry import span
+
+# Pages of results loaded before a streaming crawl gives up, whatever the caller asked for
+MAX_PAGES = int(os.getenv("SCRAPER_MAX_PAGES", "10"))
+# How long to wait for a "Load More" click to render new cards, in milliseconds
+LOAD_MORE_TIMEOUT = int(os.getenv("SCRAPER_LOAD_MORE_TIMEOUT", "15000"))
+
+LOAD_MORE_JS = "const loadMoreButton = Array.from(document.querySelectorAll('button')).find(button => button.textContent.includes('Load More')); loadMoreButton && loadMoreButton.click();"
+
+# Wait condition for the next increment: more than `count` cards on the page
+def more_cards(card_css, count):
+    return f"js:() => document.querySelectorAll({card_css!r}).length > {count}"
+
+# Yield listings from one results page as they render, clicking "Load More" in the same browser
+# tab between increments. Only the new cards of each render are parsed. Stops after `limit`
+# listings, after a listing for which `until(listing)` is true, when a click adds no cards, or
+# after `max_pages` renders. The tab is closed when the generator finishes; callers that break out
+# early should iterate under contextlib.aclosing() so that happens right away.
+async def stream_listings(crawler, url, spec, card_css, limit=None, until=None, max_pages=MAX_PAGES, site=None):
+    session_id = uuid.uuid4().hex
+    parsed = 0
+    try:
+        with span("crawler.arun", site=site):
+            result = await crawler.arun(url=url, session_id=session_id, bypass_cache=True)
+        for page in range(max_pages):
+            with span("parse", site=site):
+                listings = spec.parse(result.html, offset=parsed) if result.success else []
+            if not listings:
+                return
+            for listing in listings:
+                yield listing
+                parsed += 1
+                if (limit is not None and parsed >= limit) or (until is not None and until(listing)):
+                    return
+            if page + 1 == max_pages:
+                return
+            # Only run the click in the open tab; the wait ends once new cards are on the page
+            with span("crawler.arun", site=site):
+                result = await crawler.arun(
+                    url=url,
+                    session_id=session_id,
+                    js_code=[LOAD_MORE_JS],
+                    js_only=True,
+                    wait_for=more_cards(card_css, parsed),
+                    page_timeout=LOAD_MORE_TIMEOUT,
+                    bypass_cache=True
+                )
+    finally:
+        await crawler.crawler_strategy.kill_session(session_id)
@@ -0,0 +1,218 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from langchain.tools import BaseTool
+from listing_records import FlightRecord, HotelRecord
+from resources import resource
+from slot_filler import IATA_CITIES
+
+# Store settings
+PRICE_HISTORY_PATH = os.getenv("PRICE_HISTORY_PATH", ".price_history.sqlite3")
+# Observations older than this are dropped on the next write
+PRICE_HISTORY_RETENTION = float(os.getenv("PRICE_HISTORY_RETENTION", str(180 * 86400)))
+RECENT_WINDOW = 86400
+
+# Per listing kind: table, the columns a search is identified by, the columns that identify one
+# listing across searches, and what is stored per listing
+KINDS = {
+    'flights': {
+        'table': 'flight_prices',
+        'keys': ('src', 'des', 'ddate', 'rdate'),
+        'listing': ('airline_name', 'departure_time'),
+        'details': ('airline_name', 'departure_time', 'duration_min')
+    },
+    'hotels': {
+        'table': 'hotel_prices',
+        'keys': ('destination', 'checkin', 'checkout'),
+        'listing': ('hotel_name',),
+        'details': ('hotel_name', 'location', 'review_score')
+    }
+}
+
+def _normalize_key(column, value):
+    value = str(value).strip()
+    # Airport codes upper case, everything else lower case, so "sin"/"SIN" and "Hanoi"/"hanoi" match
+    return value.upper() if column in ('src', 'des') else value.lower()
+
+# Time series of every parsed flight and hotel listing. Each row is one observed price of one
+# listing for one search, indexed by search key, travel date and scrape time.
+class PriceHistory:
+    def __init__(self, path=PRICE_HISTORY_PATH, retention=PRICE_HISTORY_RETENTION):
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS flight_prices (
+                src TEXT NOT NULL, des TEXT NOT NULL, ddate TEXT NOT NULL, rdate TEXT NOT NULL, scraped_at REAL NOT NULL,
+                airline_name TEXT, departure_time TEXT, duration_min REAL, currency TEXT, price REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS flight_prices_route ON flight_prices (src, des, ddate, scraped_at);
+            CREATE INDEX IF NOT EXISTS flight_prices_scraped_at ON flight_prices (scraped_at);
+            CREATE TABLE IF NOT EXISTS hotel_prices (
+                destination TEXT NOT NULL, checkin TEXT NOT NULL, checkout TEXT NOT NULL, scraped_at REAL NOT NULL,
+                hotel_name TEXT, location TEXT, review_score REAL, currency TEXT, price REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS hotel_prices_destination ON hotel_prices (destination, checkin, scraped_at);
+            CREATE INDEX IF NOT EXISTS hotel_prices_scraped_at ON hotel_prices (scraped_at);
+        """)
+        self._conn.commit()
+
+    def _record(self, kind, search, records, scraped_at=None):
+        spec = KINDS[kind]
+        scraped_at = scraped_at or time.time()
+        keys = [_normalize_key(column, search[column]) for column in spec['keys']]
+        rows = [
+            (*keys, scraped_at, *(getattr(record, column) for column in spec['details']), record.currency, record.price)
+            for record in records if not math.isnan(record.price)
+        ]
+        columns = (*spec['keys'], 'scraped_at', *spec['details'], 'currency', 'price')
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT INTO {spec['table']} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+            )
+            self._conn.execute(f"DELETE FROM {spec['table']} WHERE scraped_at < ?", (scraped_at - self.retention,))
+            self._conn.commit()
+        return len(rows)
+
+    def record_flights(self, src, des, ddate, rdate, flights, scraped_at=None):
+        search = {'src': src, 'des': des, 'ddate': ddate, 'rdate': rdate}
+        return self._record('flights', search, map(FlightRecord.from_listing, flights), scraped_at)
+
+    def record_hotels(self, destination, checkin, checkout, hotels, scraped_at=None):
+        search = {'destination': destination, 'checkin': checkin, 'checkout': checkout}
+        return self._record('hotels', search, map(HotelRecord.from_listing, hotels), scraped_at)
+
+    # WHERE clause over the search keys given in `filters` and the scrape time window
+    def _where(self, kind, filters, within=None, now=None):
+        spec = KINDS[kind]
+        unknown = set(filters) - set(spec['keys']) - {'currency'}
+        if unknown:
+            raise ValueError(f"Unknown {kind} filters: {sorted(unknown)}")
+        clauses, params = [], []
+        for column in spec['keys']:
+            if filters.get(column) is not None:
+                clauses.append(f"{column} = ?")
+                params.append(_normalize_key(column, filters[column]))
+        if filters.get('currency'):
+            clauses.append("currency = ?")
+            params.append(filters['currency'])
+        if within is not None:
+            clauses.append("scraped_at >= ?")
+            params.append((now or time.time()) - within)
+        return " AND ".join(clauses) or "1", params
+
+    # Airport codes searched before, so routes to airports outside IATA_CITIES are still recognised
+    def known_airports(self):
+        rows = self._query("SELECT src AS code FROM flight_prices UNION SELECT des FROM flight_prices", ())
+        return {row['code'] for row in rows}
+
+    def _query(self, sql, params):
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    # Cheapest observations in the window, one per listing whatever the travel dates, e.g.
+    # cheapest('hotels', destination='hanoi') or cheapest('flights', src='SIN', des='HAN', ddate='2024-10-18')
+    def cheapest(self, kind, within=RECENT_WINDOW, limit=5, **filters):
+        spec = KINDS[kind]
+        where, params = self._where(kind, filters, within)
+        columns = ', '.join((*spec['keys'], 'scraped_at', *spec['details'], 'currency'))
+        return self._query(
+            # SQLite fills the bare columns from the row holding the MIN
+            f"SELECT {columns}, MIN(price) AS price FROM {spec['table']} WHERE {where} "
+            f"GROUP BY {', '.join(spec['listing'])}, currency ORDER BY price LIMIT ?",
+            (*params, limit)
+        )
+
+    # Lowest, highest and average price per currency over the window (None: all history)
+    def stats(self, kind, within=None, **filters):
+        where, params = self._where(kind, filters, within)
+        return self._query(
+            f"SELECT currency, MIN(price) AS min_price, MAX(price) AS max_price, AVG(price) AS avg_price, "
+            f"COUNT(*) AS observations, MIN(scraped_at) AS first_seen, MAX(scraped_at) AS last_seen "
+            f"FROM {KINDS[kind]['table']} WHERE {where} GROUP BY currency ORDER BY observations DESC",
+            params
+        )
+
+    # Cheapest and average price per day of scraping, oldest first
+    def trend(self, kind, days=14, **filters):
+        where, params = self._where(kind, filters, days * 86400)
+        return self._query(
+            f"SELECT date(scraped_at, 'unixepoch') AS day, currency, MIN(price) AS min_price, AVG(price) AS avg_price, "
+            f"COUNT(*) AS observations FROM {KINDS[kind]['table']} WHERE {where} "
+            f"GROUP BY day, currency ORDER BY day",
+            params
+        )
+
+@resource
+def get_price_history():
+    return PriceHistory()
+
+CITY_CODES = {}
+for code, city in IATA_CITIES.items():
+    CITY_CODES.setdefault(city.lower(), code)
+
+# "SIN to HAN", "flights from Singapore to Hanoi", "SIN-HAN"; both ends must name a known airport
+ROUTE_PATTERNS = [
+    re.compile(r"^\s*(?:flights?\s+)?(?:from\s+)?(.+?)\s+(?:to|→)\s+(.+?)\s*$", re.IGNORECASE),
+    re.compile(r"^\s*([A-Za-z]{3})\s*[-→]\s*([A-Za-z]{3})\s*$")
+]
+
+# Airport code of a known city name or code, otherwise None
+def _airport(place, known_codes):
+    place = place.strip()
+    code = CITY_CODES.get(place.lower(), place.upper())
+    return code if code in IATA_CITIES or code in known_codes else None
+
+def _format_price(row, price_column='price'):
+    return f"{row['currency'] or ''} {row[price_column]:,.0f}".strip()
+
+# Lets the transport and accommodation agents answer price questions from what was already scraped
+class PriceHistoryTool(BaseTool):
+    name: str = "price_history"
+    description: str = (
+        "Recently scraped prices, without a live search. Input is a flight route like 'SIN to HAN' "
+        "or a hotel destination like 'Hanoi'. Returns the cheapest prices seen in the last 24 hours "
+        "and the lowest and highest prices seen in the last 30 days."
+    )
+
+    def _run(self, query: str, **kwargs) -> str:
+        history = get_price_history()
+        route = next(filter(None, (pattern.match(query) for pattern in ROUTE_PATTERNS)), None)
+        if route:
+            known_codes = history.known_airports()
+            src, des = _airport(route.group(1), known_codes), _airport(route.group(2), known_codes)
+            # "hotels close to the beach" is not a route
+            if not (src and des):
+                route = None
+        if route:
+            kind, label = 'flights', 'airline_name'
+            filters = {'src': src, 'des': des}
+            subject = f"flights {filters['src']} to {filters['des']}"
+        else:
+            kind, label = 'hotels', 'hotel_name'
+            filters = {'destination': re.sub(r"^\s*hotels?\s+(?:in\s+)?", '', query, flags=re.IGNORECASE)}
+            subject = f"hotels in {filters['destination'].strip()}"
+
+        cheapest = history.cheapest(kind, **filters)
+        stats = history.stats(kind, within=30 * 86400, **filters)
+        if not cheapest and not stats:
+            return f"No recorded prices for {subject}; a live search is needed."
+
+        lines = []
+        if cheapest:
+            lines.append(f"Cheapest {subject} seen in the last 24 hours:")
+            for row in cheapest:
+                travel = row['ddate'] if kind == 'flights' else row['checkin']
+                lines.append(f"- {row[label] or 'Unknown'}: {_format_price(row)} (travel date {travel})")
+        else:
+            lines.append(f"No {subject} prices seen in the last 24 hours.")
+        for row in stats:
+            lines.append(
+                f"Last 30 days: {_format_price(row, 'min_price')} to {_format_price(row, 'max_price')}, "
+                f"average {_format_price(row, 'avg_price')} over {row['observations']} observations."
+            )
+        return "\n".join(lines)
@@ -0,0 +1,362 @@
+import asyncio
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import asdict, fields
+from difflib import SequenceMatcher
+from langchain.tools import BaseTool
+from browser_pool import close_default_pool
+from extraction_tool import build_kayak_url, parse_flight_results, parse_hotel_results
+from Flights_Scrapper import flight_queries, scrape_flights
+from Hotels_Scrapper import build_booking_url, hotel_queries, scrape_hotels, with_hotel_metadata
+from http_client import get_http_client
+from listing_records import FlightRecord, HotelRecord
+from price_history import CITY_CODES
+from telemetry import increment, span
+
+# Merge settings
+# Providers still running this long after the search started are cancelled and left out
+PROVIDER_DEADLINE = float(os.getenv("PROVIDER_DEADLINE", "20"))
+PROVIDER_TOP_K = int(os.getenv("PROVIDER_TOP_K", "10"))
+# Names this similar (difflib ratio over their sorted words) are the same listing
+NAME_SIMILARITY = float(os.getenv("PROVIDER_NAME_SIMILARITY", "0.85"))
+# Flights without a departure time on one side only merge when their prices are this close
+PRICE_TOLERANCE = 0.02
+# Hotels whose distances from the centre differ by more than this are different hotels
+DISTANCE_TOLERANCE = 0.3
+
+# Words that say nothing about which airline or hotel a listing is, when the name has others
+GENERIC_WORDS = {
+    'flights': {'airline', 'airlines', 'airways', 'the', 'ltd', 'limited'},
+    'hotels': {'the', 'a', 'and', 'by', 'hotel', 'hotels', 'resort', 'resorts', 'inn', 'spa', 'suites'}
+}
+
+# One source of listings. `search(query, limit)` takes the keyword arguments of scrape_flights
+# or scrape_hotels (see flight_queries / hotel_queries) and returns listing dicts in that
+# scraper's shape, so FlightRecord / HotelRecord can read any provider's output.
+class Provider(ABC):
+    name = None
+    kind = None
+
+    @abstractmethod
+    async def search(self, query, limit=None):
+        pass
+
+class BingFlights(Provider):
+    name = 'bing'
+    kind = 'flights'
+
+    async def search(self, query, limit=None):
+        return await scrape_flights(**query, limit=limit)
+
+class KayakFlights(Provider):
+    name = 'kayak'
+    kind = 'flights'
+
+    async def search(self, query, limit=None):
+        url = build_kayak_url(query['src'], query['des'], query['ddate'], query.get('rdate'))
+        content = await get_http_client().aget(url, conditional=True)
+        # Kayak cards only carry the airline and price
+        return [{'airline_name': flight['airline'], 'price': flight['price']} for flight in parse_flight_results(content, limit)]
+
+class BookingHotels(Provider):
+    name = 'booking'
+    kind = 'hotels'
+
+    async def search(self, query, limit=None):
+        return await scrape_hotels(**query, limit=limit)
+
+# The same Booking.com results page fetched over plain HTTP: no browser, but only names and
+# prices, with addresses and review scores filled in from earlier Booking crawls when known
+class BookingLiteHotels(Provider):
+    name = 'booking_lite'
+    kind = 'hotels'
+
+    async def search(self, query, limit=None):
+        content = await get_http_client().aget(build_booking_url(**query), conditional=True)
+        return await asyncio.to_thread(with_hotel_metadata, query['destination'], parse_hotel_results(content, limit))
+
+PROVIDERS = {
+    'flights': [BingFlights(), KayakFlights()],
+    'hotels': [BookingHotels(), BookingLiteHotels()]
+}
+
+RECORD_TYPES = {'flights': FlightRecord, 'hotels': HotelRecord}
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+def _words(text):
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode().lower()
+    return re.findall(r"[a-z0-9]+", text)
+
+# Name words that identify the listing. Generic words are dropped only when a distinctive word
+# remains: the searched city doesn't count, so "Hotel Hanoi" and "Resort Hanoi" stay apart.
+def _name_words(kind, name, place_words=frozenset()):
+    words = _words(name)
+    generic = GENERIC_WORDS[kind]
+    if not any(word not in generic and word not in place_words for word in words):
+        return words
+    return [word for word in words if word not in generic]
+
+# One merged listing: the best-known record plus the lowest price each provider offered
+class MergedListing:
+    def __init__(self, record, name_key):
+        self.record = record
+        self.name_key = name_key
+        self.sources = set()
+        self.offers = {}
+
+    def add_offer(self, provider, record):
+        self.sources.add(provider)
+        if not math.isnan(record.price) and (provider not in self.offers or record.price < self.offers[provider]):
+            self.offers[provider] = record.price
+        current = self.record
+        if not math.isnan(record.price) and (
+            math.isnan(current.price) or (record.currency == current.currency and record.price < current.price)
+        ):
+            current.price, current.currency = record.price, record.currency
+        # Fill what this provider knows and the others didn't, e.g. Booking's review score for a Booking lite hit
+        for field in fields(current):
+            if field.name not in ('price', 'currency') and _missing(getattr(current, field.name)):
+                setattr(current, field.name, getattr(record, field.name))
+
+    def to_dict(self):
+        listing = asdict(self.record)
+        listing['sources'] = sorted(self.sources)
+        listing['offers'] = dict(self.offers)
+        return listing
+
+# Folds listings from any number of providers into one deduplicated set. Exact duplicates are
+# found by hashing a normalized key; near duplicates ("Hanoi Grand Hotel" / "The Grand Hanoi")
+# by difflib, compared only against listings sharing at least one name word.
+class ListingMerger:
+    def __init__(self, kind, similarity=NAME_SIMILARITY, place=None):
+        self.kind = kind
+        self.similarity = similarity
+        self.place_words = frozenset(_words(place))
+        self.listings = []
+        self._exact = {}
+        self._blocks = {}
+
+    # Hotel names repeat across neighbourhoods, so equal keys are still checked with _same_hotel
+    def _exact_key(self, record, name_key):
+        if self.kind == 'hotels':
+            return name_key
+        if record.departure_time:
+            return (name_key, record.departure_time.replace(' ', '').lower())
+        return (name_key, record.currency, record.price)
+
+    def _same_flight(self, listing, record):
+        if listing.record.departure_time and record.departure_time:
+            return listing.record.departure_time.replace(' ', '').lower() == record.departure_time.replace(' ', '').lower()
+        # Kayak has no times: the same airline at (almost) the same fare is taken as the same flight
+        existing = listing.record
+        return (
+            existing.currency == record.currency
+            and not math.isnan(existing.price) and not math.isnan(record.price)
+            and abs(existing.price - record.price) <= PRICE_TOLERANCE * min(existing.price, record.price)
+        )
+
+    # Booking lite has neither address nor distance, so a missing value never tells hotels apart
+    def _same_hotel(self, listing, record):
+        existing = listing.record
+        if existing.location and record.location and set(_words(existing.location)) != set(_words(record.location)):
+            return False
+        return (
+            _missing(existing.distance_km) or _missing(record.distance_km)
+            or abs(existing.distance_km - record.distance_km) <= DISTANCE_TOLERANCE
+        )
+
+    def _same(self, listing, record):
+        return self._same_hotel(listing, record) if self.kind == 'hotels' else self._same_flight(listing, record)
+
+    def _find(self, record, words, name_key):
+        for listing in self._exact.get(self._exact_key(record, name_key), ()):
+            if self._same(listing, record):
+                return listing
+        candidates = {id(candidate): candidate for word in words for candidate in self._blocks.get(word, ())}
+        for candidate in candidates.values():
+            if SequenceMatcher(None, candidate.name_key, name_key).ratio() >= self.similarity and self._same(candidate, record):
+                return candidate
+        return None
+
+    def add(self, provider, listings):
+        added = 0
+        for item in listings:
+            record = RECORD_TYPES[self.kind].from_listing(item)
+            words = _name_words(self.kind, record.hotel_name if self.kind == 'hotels' else record.airline_name, self.place_words)
+            if not words:
+                continue
+            name_key = ' '.join(sorted(words))
+            listing = self._find(record, words, name_key)
+            if listing is None:
+                listing = MergedListing(record, name_key)
+                self.listings.append(listing)
+                for word in set(words):
+                    self._blocks.setdefault(word, []).append(listing)
+                added += 1
+            listing.add_offer(provider, record)
+            same_key = self._exact.setdefault(self._exact_key(listing.record, name_key), [])
+            if listing not in same_key:
+                same_key.append(listing)
+        return added
+
+    # Cheapest first; prices are compared as numbers, so query every provider in the same market
+    def top_k(self, k=PROVIDER_TOP_K):
+        ranked = sorted(self.listings, key=lambda listing: (math.isnan(listing.record.price), listing.record.price))
+        return [listing.to_dict() for listing in ranked[:k]]
+
+async def _search(provider, query, limit):
+    try:
+        with span("provider", provider=provider.name, kind=provider.kind):
+            return await provider.search(query, limit)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        # One broken source shouldn't hide the others
+        increment("provider_errors_total", provider=provider.name)
+        return None
+
+# Queries every provider of `kind` at once and yields the merged top `k` each time one of them
+# answers, so the cheapest options show up as soon as the fastest source has them. Providers
+# still running at `deadline` seconds are cancelled. Close early with contextlib.aclosing.
+async def stream_merged(kind, query, providers=None, k=PROVIDER_TOP_K, deadline=PROVIDER_DEADLINE, limit=None):
+    providers = providers or PROVIDERS[kind]
+    merger = ListingMerger(kind, place=query.get('destination'))
+    loop = asyncio.get_running_loop()
+    end = loop.time() + deadline
+    tasks = {asyncio.create_task(_search(provider, query, limit)): provider for provider in providers}
+    pending = set(tasks)
+    timed_out = False
+    try:
+        while pending:
+            remaining = end - loop.time()
+            if remaining <= 0:
+                timed_out = True
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            answered = False
+            for task in done:
+                listings = task.result()
+                if listings is not None:
+                    merger.add(tasks[task].name, listings)
+                    answered = True
+            if answered:
+                yield merger.top_k(k)
+    finally:
+        for task in pending:
+            if timed_out:
+                increment("provider_timeouts_total", provider=tasks[task].name)
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+
+# Final merged top `k` once every provider answered or the deadline passed
+async def search_merged(kind, query, providers=None, k=PROVIDER_TOP_K, deadline=PROVIDER_DEADLINE, limit=None):
+    merged = []
+    async for merged in stream_merged(kind, query, providers, k, deadline, limit):
+        pass
+    return merged
+
+_search_loop = None
+_search_loop_lock = threading.Lock()
+
+# Tool calls from agent threads share one long-lived loop, so the browser pool and HTTP client
+# bound to it stay warm between calls instead of starting and stopping with each asyncio.run
+def _get_search_loop():
+    global _search_loop
+    with _search_loop_lock:
+        if _search_loop is None:
+            _search_loop = asyncio.new_event_loop()
+            threading.Thread(target=_search_loop.run_forever, name="provider-search", daemon=True).start()
+        return _search_loop
+
+DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def _format_listing(kind, listing):
+    price = "price unknown" if _missing(listing['price']) else f"{listing['currency'] or ''} {listing['price']:,.0f}".strip()
+    if kind == 'flights':
+        duration = None if _missing(listing['duration_min']) else f"{listing['duration_min']:.0f} min"
+        name = ", ".join(filter(None, [listing['airline_name'], listing['departure_time'], duration]))
+    else:
+        where = ", ".join(filter(None, [listing['location'], None if _missing(listing['distance_km']) else f"{listing['distance_km']:g} km from centre"]))
+        name = f"{listing['hotel_name']} ({where})" if where else listing['hotel_name']
+    return f"- {name}: {price} (from {', '.join(listing['sources'])})"
+
+# Live prices from every provider of one kind, merged and deduplicated, for the agents
+class MergedSearchTool(BaseTool):
+    kind: str
+
+    # (subject, keyword arguments of scrape_flights / scrape_hotels), or an error message for the agent
+    @abstractmethod
+    def _query(self, text):
+        pass
+
+    def _format(self, subject, listings):
+        if not listings:
+            return f"No {subject} found."
+        return "\n".join([f"Cheapest {subject}:", *(_format_listing(self.kind, listing) for listing in listings)])
+
+    async def _arun(self, text: str, **kwargs) -> str:
+        query = self._query(text)
+        if isinstance(query, str):
+            return query
+        subject, query = query
+        return self._format(subject, await search_merged(self.kind, query, k=PROVIDER_TOP_K))
+
+    # Agents call tools from worker threads; search_merged stops at PROVIDER_DEADLINE, the
+    # extra seconds are for cancelling the providers still running then
+    def _run(self, text: str, **kwargs) -> str:
+        future = asyncio.run_coroutine_threadsafe(self._arun(text), _get_search_loop())
+        try:
+            return future.result(timeout=PROVIDER_DEADLINE + 5)
+        except FutureTimeoutError:
+            future.cancel()
+            return f"The {self.kind} search did not finish within {PROVIDER_DEADLINE:.0f} seconds."
+
+class FlightSearchTool(MergedSearchTool):
+    name: str = "flight_search"
+    description: str = (
+        "Live flight prices from several sites, cheapest first. Input is a route with departure "
+        "and return dates, like 'SIN to HAN, 2024-11-01, 2024-11-08'."
+    )
+    kind: str = 'flights'
+
+    def _query(self, text):
+        route, dates = DATE.split(text)[0], DATE.findall(text)
+        places = re.split(r"\s+(?:to|→)\s+|\s*-\s*", route.strip(" ,"), maxsplit=1, flags=re.IGNORECASE)
+        if len(places) != 2 or len(dates) != 2:
+            return "Input must be a route and two dates, like 'SIN to HAN, 2024-11-01, 2024-11-08'."
+        src, des = (CITY_CODES.get(place.strip().lower(), place.strip().upper()) for place in places)
+        return f"flights {src} to {des}", flight_queries([(src, des)], [tuple(dates)])[0]
+
+class HotelSearchTool(MergedSearchTool):
+    name: str = "hotel_search"
+    description: str = (
+        "Live hotel prices from several sites, cheapest first. Input is a destination with check-in "
+        "and check-out dates, like 'Hanoi, 2024-11-01, 2024-11-05'."
+    )
+    kind: str = 'hotels'
+
+    def _query(self, text):
+        destination, dates = DATE.split(text)[0].strip(" ,"), DATE.findall(text)
+        if not destination or len(dates) != 2:
+            return "Input must be a destination and two dates, like 'Hanoi, 2024-11-01, 2024-11-05'."
+        return f"hotels in {destination}", hotel_queries([destination], [tuple(dates)])[0]
+
+async def main():
+    query = {'src': 'sin', 'des': 'han', 'ddate': '2024-10-18', 'rdate': '2024-10-25', 'adult': 1, 'child': 0, 'infant': 0}
+    try:
+        async for flights in stream_merged('flights', query, k=5):
+            print(json.dumps(flights, indent=4, ensure_ascii=False))
+    finally:
+        await close_default_pool()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+import asyncio
+import functools
+import os
+import sys
+import threading
+import weakref
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# spaCy model, loaded without the pipeline components entity extraction never uses
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+SPACY_DISABLED = ["tagger", "parser", "attribute_ruler", "lemmatizer"]
+
+def _in_streamlit():
+    if "streamlit" not in sys.modules:
+        return False
+    from streamlit import runtime
+    return runtime.exists()
+
+# Build an expensive object on first use and reuse it for the rest of the process.
+# Under Streamlit this is st.cache_resource, so objects created by a script also survive reruns.
+def resource(fn):
+    cache = {}
+    lock = threading.Lock()
+    streamlit_cached = None
+
+    @functools.wraps(fn)
+    def wrapper(*args):
+        nonlocal streamlit_cached
+        if _in_streamlit():
+            if streamlit_cached is None:
+                streamlit_cached = sys.modules["streamlit"].cache_resource(show_spinner=False)(fn)
+            return streamlit_cached(*args)
+        with lock:
+            if args not in cache:
+                cache[args] = fn(*args)
+            return cache[args]
+
+    return wrapper
+
+_loop_closers = weakref.WeakKeyDictionary()
+
+# Await `close()` when the running event loop shuts down. asyncio.run closes every async generator
+# still open on its loop before closing the loop, so a parked generator's `finally` runs then.
+async def close_with_loop(close):
+    async def closer():
+        try:
+            yield
+        finally:
+            await close()
+
+    parked = closer()
+    await parked.__anext__()
+    _loop_closers.setdefault(asyncio.get_running_loop(), []).append(parked)
+
+@resource
+def get_nlp():
+    import spacy
+    return spacy.load(SPACY_MODEL, disable=SPACY_DISABLED)
+
+# Every call reports its token usage to telemetry
+@resource
+def get_llm(temperature):
+    from langchain_groq import ChatGroq
+    from telemetry import TokenUsageHandler
+    llm = ChatGroq(temperature=temperature, groq_api_key=os.getenv("GROQ_API_KEY"), model_name="mixtral-8x7b-32768")
+    llm.callbacks = [TokenUsageHandler()]
+    return llm
+
+# Search tools are wrapped so agents share cached results and one request per identical query
+@resource
+def get_search_tool():
+    from langchain_community.tools import DuckDuckGoSearchRun
+    from search_cache import cached_tool
+    return cached_tool(DuckDuckGoSearchRun(), backend="duckduckgo")
+
+# Answers price questions from previously scraped listings
+@resource
+def get_price_history_tool():
+    from price_history import PriceHistoryTool
+    return PriceHistoryTool()
+
+# Live prices merged from every flight or hotel provider
+@resource
+def get_flight_search_tool():
+    from providers import FlightSearchTool
+    return FlightSearchTool()
+
+@resource
+def get_hotel_search_tool():
+    from providers import HotelSearchTool
+    return HotelSearchTool()
+
+@resource
+def get_wikipedia_tool():
+    from langchain_community.tools.wikipedia.tool import WikipediaQueryRun, WikipediaAPIWrapper
+    from search_cache import cached_tool
+    return cached_tool(WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper()), backend="wikipedia")
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+# Batch settings
+BATCH_CONCURRENCY = int(os.getenv("SCRAPER_BATCH_CONCURRENCY", "4"))
+DOMAIN_RATE = float(os.getenv("SCRAPER_DOMAIN_RATE", "1.0"))
+
+# One finished query: `result` is set on success, `error` holds the exception otherwise
+BatchResult = namedtuple('BatchResult', ['query', 'result', 'error'])
+
+# Spaces request starts to each domain so a batch doesn't get us throttled
+class DomainRateLimiter:
+    def __init__(self, requests_per_second=DOMAIN_RATE):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot = {}
+
+    async def wait(self, domain):
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(domain, now))
+        self._next_slot[domain] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+_default_limiter = None
+
+def get_default_limiter():
+    global _default_limiter
+    if _default_limiter is None:
+        _default_limiter = DomainRateLimiter()
+    return _default_limiter
+
+# (departure, return) date pairs for every trip of `stay_days` starting between `start` and `end`
+def date_windows(start, end, stay_days, step_days=1):
+    start = date.fromisoformat(str(start))
+    end = date.fromisoformat(str(end))
+    windows = []
+    day = start
+    while day <= end:
+        windows.append((day.isoformat(), (day + timedelta(days=stay_days)).isoformat()))
+        day += timedelta(days=step_days)
+    return windows
+
+# `fetch(query, throttle)` awaits `throttle()` right before it goes to the site, so answers
+# served from a cache don't use up the domain's request rate
+def _bounded(fetch, domain, concurrency, limiter):
+    limiter = limiter or get_default_limiter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    def throttle():
+        return limiter.wait(domain)
+
+    async def run(query):
+        async with semaphore:
+            try:
+                return BatchResult(query, await fetch(query, throttle), None)
+            except Exception as e:
+                return BatchResult(query, None, e)
+
+    return run
+
+# Run `fetch(query, throttle)` for every query concurrently and yield results as they complete
+async def iter_batch(queries, fetch, domain, concurrency=BATCH_CONCURRENCY, limiter=None):
+    run = _bounded(fetch, domain, concurrency, limiter)
+    tasks = [asyncio.create_task(run(query)) for query in queries]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The consumer may stop early; don't leave searches running in the background
+        for task in tasks:
+            task.cancel()
+
+# Same as iter_batch, but wait for everything and return results in query order
+async def run_batch(queries, fetch, domain, concurrency=BATCH_CONCURRENCY, limiter=None):
+    run = _bounded(fetch, domain, concurrency, limiter)
+    return await asyncio.gather(*(run(query) for query in queries))
@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from telemetry import record_cache
+
+# Cache settings (seconds / entries)
+CACHE_PATH = os.getenv("SCRAPER_CACHE_PATH", ".scraper_cache.sqlite3")
+PRICE_TTL = float(os.getenv("SCRAPER_PRICE_TTL", "900"))
+# Hotel names, addresses and review scores change far less often than prices
+METADATA_TTL = float(os.getenv("SCRAPER_METADATA_TTL", "604800"))
+STALE_TTL = float(os.getenv("SCRAPER_STALE_TTL", "3600"))
+MAX_ENTRIES = int(os.getenv("SCRAPER_CACHE_MAX_ENTRIES", "5000"))
+
+# Normalize search parameters so equivalent queries share one cache entry
+def normalize_params(params):
+    normalized = {}
+    for key, value in params.items():
+        if isinstance(value, str):
+            value = " ".join(value.strip().lower().split())
+            if value.isdigit():
+                value = int(value)
+        normalized[key] = value
+    return normalized
+
+def cache_key(namespace, params):
+    payload = json.dumps(normalize_params(params), sort_keys=True, default=str)
+    return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+# Disk-backed store of parsed listings with freshness TTLs and LRU eviction
+class ScraperCache:
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, namespace TEXT NOT NULL, value TEXT NOT NULL, "
+            "stored_at REAL NOT NULL, expires_at REAL NOT NULL, stale_until REAL NOT NULL, "
+            "accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self._conn.commit()
+
+    # Returns (value, fresh); value is None on a miss or once the stale window has passed
+    def get(self, namespace, params):
+        key = cache_key(namespace, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, stale_until FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None, False
+            value, expires_at, stale_until = row
+            if now > stale_until:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                return None, False
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(value), now <= expires_at
+
+    def set(self, namespace, params, value, ttl, stale_ttl=STALE_TTL):
+        key = cache_key(namespace, params)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(key, namespace, value, stored_at, expires_at, stale_until, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, namespace, json.dumps(value, ensure_ascii=False), now, now + ttl, now + ttl + stale_ttl, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    # Drop the least recently used entries once the cache grows past max_entries
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def clear(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                self._conn.execute("DELETE FROM entries")
+            else:
+                self._conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ScraperCache()
+        return _default_cache
+
+# Keys with a background revalidation in flight, and the tasks running them
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+_refresh_tasks = set()
+_refresh_loop = None
+
+# Revalidations run on a long-lived loop of their own: on the caller's loop, a one-shot
+# asyncio.run caller would cancel them as soon as it returned
+def _get_refresh_loop():
+    global _refresh_loop
+    with _refreshing_lock:
+        if _refresh_loop is None:
+            _refresh_loop = asyncio.new_event_loop()
+            threading.Thread(target=_refresh_loop.run_forever, name="scraper-cache-refresh", daemon=True).start()
+        return _refresh_loop
+
+def _start_refresh(coro):
+    task = _refresh_loop.create_task(coro)
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+async def _refresh(cache, namespace, params, scrape, ttl, stale_ttl):
+    key = cache_key(namespace, params)
+    try:
+        value = await scrape()
+        if value:
+            cache.set(namespace, params, value, ttl, stale_ttl)
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(key)
+
+# Serve parsed listings from the cache, scraping on a miss and revalidating stale entries in the background.
+# `refresh` does the background scrape (default: `scrape`); it runs on another event loop, so it
+# must not use anything bound to the caller's loop, such as an explicitly passed browser pool.
+async def cached_scrape(cache, namespace, params, scrape, ttl=PRICE_TTL, stale_ttl=STALE_TTL, refresh=None):
+    value, fresh = cache.get(namespace, params)
+    record_cache(f"scraper:{namespace}", "miss" if value is None else "hit" if fresh else "stale")
+    if value is not None and fresh:
+        return value
+
+    if value is not None:
+        key = cache_key(namespace, params)
+        with _refreshing_lock:
+            start = key not in _refreshing
+            _refreshing.add(key)
+        if start:
+            loop = _get_refresh_loop()
+            loop.call_soon_threadsafe(_start_refresh, _refresh(cache, namespace, params, refresh or scrape, ttl, stale_ttl))
+        return value
+
+    value = await scrape()
+    # Empty results usually mean a blocked or broken render, so don't pin them in the cache
+    if value:
+        cache.set(namespace, params, value, ttl, stale_ttl)
+    return value
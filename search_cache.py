@@ -0,0 +1,161 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any
+from langchain.tools import BaseTool
+from telemetry import record_cache, span
+
+# Cache settings
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "3600"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1000"))
+SEARCH_RATE = float(os.getenv("SEARCH_RATE", "1.0"))
+
+# Spaces calls to one backend; safe to share between threads and event loops
+class RateLimiter:
+    def __init__(self, requests_per_second=SEARCH_RATE):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+            return slot - now
+
+    def wait(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def await_slot(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(backend):
+    with _limiters_lock:
+        if backend not in _limiters:
+            _limiters[backend] = RateLimiter()
+        return _limiters[backend]
+
+# TTL/LRU result cache where concurrent identical queries share one in-flight request
+class SearchCache:
+    def __init__(self, ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_MAX_ENTRIES, name="search"):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    # Returns (value, None, False) on a hit, otherwise (None, future, owner): the owner computes
+    # the value and resolves the future, everyone else waits on it
+    def _claim(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                record_cache(self.name, "hit")
+                return entry[0], None, False
+            if key in self._inflight:
+                self.coalesced += 1
+                record_cache(self.name, "coalesced")
+                return None, self._inflight[key], False
+            self.misses += 1
+            record_cache(self.name, "miss")
+            future = Future()
+            self._inflight[key] = future
+            return None, future, True
+
+    def _finish(self, key, future, value=None, error=None):
+        with self._lock:
+            self._inflight.pop(key, None)
+            if error is None:
+                self._entries[key] = (value, time.monotonic())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+    def fetch(self, key, compute):
+        value, future, owner = self._claim(key)
+        if future is None:
+            return value
+        if not owner:
+            return future.result()
+        try:
+            value = compute()
+        except Exception as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, value)
+        return value
+
+    async def afetch(self, key, compute):
+        value, future, owner = self._claim(key)
+        if future is None:
+            return value
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            value = await compute()
+        except BaseException as e:
+            # Includes cancellation, so waiters on this query are never left hanging
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, value)
+        return value
+
+# Drop-in replacement for a search tool in an agent's `tools=[...]`
+class CachedSearchTool(BaseTool):
+    name: str = "cached_search"
+    description: str = ""
+    inner: BaseTool
+    backend: str
+    cache: Any
+    limiter: Any
+
+    def _key(self, query):
+        return " ".join(str(query).lower().split())
+
+    def _run(self, query: str, **kwargs) -> str:
+        def compute():
+            self.limiter.wait()
+            return self.inner.run(query)
+
+        with span("tool", tool=self.name):
+            return self.cache.fetch(self._key(query), compute)
+
+    async def _arun(self, query: str, **kwargs) -> str:
+        async def compute():
+            await self.limiter.await_slot()
+            return await self.inner.arun(query)
+
+        with span("tool", tool=self.name):
+            return await self.cache.afetch(self._key(query), compute)
+
+def cached_tool(inner, backend=None, ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_MAX_ENTRIES):
+    backend = backend or inner.name
+    return CachedSearchTool(
+        name=inner.name,
+        description=inner.description,
+        inner=inner,
+        backend=backend,
+        cache=SearchCache(ttl, max_entries, name=f"search:{backend}"),
+        limiter=get_limiter(backend)
+    )
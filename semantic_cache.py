@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+import numpy as np
+from resources import resource
+from telemetry import record_cache
+
+# Cache settings
+PLAN_CACHE_PATH = os.getenv("PLAN_CACHE_PATH", ".plan_cache.sqlite3")
+PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", "86400"))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "2000"))
+PLAN_CACHE_THRESHOLD = float(os.getenv("PLAN_CACHE_THRESHOLD", "0.92"))
+# spaCy model with static word vectors; without one, a hashed character n-gram embedding is used
+EMBEDDING_MODEL = os.getenv("PLAN_CACHE_EMBEDDING_MODEL", "en_core_web_md")
+
+HASHING_DIMENSIONS = 1024
+STOPWORDS = set("""
+a an and are as at be by for from i in is it me my of on or our the to traveler traveller travelling traveling
+trip we who with would like want looking going
+""".split())
+GUARD_LABELS = ('GPE', 'LOC', 'FAC', 'NORP', 'DATE', 'CARDINAL', 'MONEY')
+
+def normalize_prompt(text):
+    return " ".join(re.sub(r"[^\w\s$€£₹.-]", " ", text.lower()).split())
+
+# Deterministic fallback embedding: hashed character trigrams, L2-normalised
+class HashingEmbedder:
+    def __init__(self, dimensions=HASHING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    # Without a language model the content words decide on their own: prompts with the same set
+    # of them share an answer whatever the word order, punctuation or filler, and no others do.
+    # Character trigrams score reorderings too low for the threshold to be of any use.
+    matches_on_terms = True
+
+    def terms(self, text):
+        return sorted({word.strip('.-') for word in normalize_prompt(text).split()} - STOPWORDS - {''})
+
+    def embed(self, text):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        padded = f"  {normalize_prompt(text)}  "
+        for trigram, count in Counter(padded[i:i + 3] for i in range(len(padded) - 2)).items():
+            digest = hashlib.blake2b(trigram.encode('utf-8'), digest_size=8).digest()
+            vector[int.from_bytes(digest, 'little') % self.dimensions] += count
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+class SpacyEmbedder:
+    matches_on_terms = False
+
+    def __init__(self, nlp):
+        self.nlp = nlp
+        self.dimensions = nlp.vocab.vectors_length
+
+    def terms(self, text):
+        return sorted({ent.text.lower() for ent in self.nlp(text).ents if ent.label_ in GUARD_LABELS})
+
+    def embed(self, text):
+        vector = self.nlp(normalize_prompt(text)).vector.astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+@resource
+def get_embedder():
+    try:
+        import spacy
+        nlp = spacy.load(EMBEDDING_MODEL, disable=["tagger", "parser", "attribute_ruler", "lemmatizer"])
+    except (ImportError, OSError):
+        return HashingEmbedder()
+    return SpacyEmbedder(nlp) if nlp.vocab.vectors_length else HashingEmbedder()
+
+# Two-tier response cache: exact match on the normalised prompt, then nearest neighbour by cosine
+# similarity. A semantic hit also needs the same key terms (places, numbers), so "Vietnam, 2 weeks"
+# never answers "Thailand, 2 weeks" however close the embeddings are. With the hashing fallback
+# the second tier is a match on equal term sets, without a similarity threshold.
+class SemanticCache:
+    def __init__(self, path=PLAN_CACHE_PATH, ttl=PLAN_CACHE_TTL, max_entries=PLAN_CACHE_MAX_ENTRIES,
+                 threshold=PLAN_CACHE_THRESHOLD, embedder=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.embedder = embedder or get_embedder()
+        self.metrics = Counter()
+        self._lock = threading.Lock()
+        self._index = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, namespace TEXT NOT NULL, prompt TEXT NOT NULL, terms TEXT NOT NULL, "
+            "embedding BLOB NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_namespace ON entries (namespace)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(namespace, prompt):
+        return hashlib.sha256(f"{namespace}\0{normalize_prompt(prompt)}".encode('utf-8')).hexdigest()
+
+    # Embeddings of one namespace as a matrix, loaded from disk on first use
+    def _namespace_index(self, namespace):
+        if namespace not in self._index:
+            rows = self._conn.execute(
+                "SELECT key, terms, embedding FROM entries WHERE namespace = ? AND created_at >= ?",
+                (namespace, time.time() - self.ttl)
+            ).fetchall()
+            # Entries written with a different embedder can't be compared with this one
+            rows = [row for row in rows if len(row[2]) == self.embedder.dimensions * 4]
+            keys = [row[0] for row in rows]
+            terms = [json.loads(row[1]) for row in rows]
+            vectors = np.array([np.frombuffer(row[2], dtype=np.float32) for row in rows]) if rows else None
+            self._index[namespace] = (keys, terms, vectors)
+        return self._index[namespace]
+
+    def _lookup(self, key):
+        row = self._conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return json.loads(row[0])
+
+    def get(self, namespace, prompt):
+        key = self._key(namespace, prompt)
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.metrics['exact_hits'] += 1
+                record_cache("plan_cache", "hit")
+                return value
+
+            keys, terms, vectors = self._namespace_index(namespace)
+            if vectors is not None and len(vectors):
+                query_terms = self.embedder.terms(prompt)
+                similarities = vectors @ self.embedder.embed(prompt)
+                for index in np.argsort(-similarities):
+                    if similarities[index] < self.threshold and not (self.embedder.matches_on_terms and query_terms):
+                        break
+                    if terms[index] == query_terms:
+                        value = self._lookup(keys[index])
+                        if value is not None:
+                            self.metrics['semantic_hits'] += 1
+                            record_cache("plan_cache", "semantic_hit")
+                            return value
+
+            self.metrics['misses'] += 1
+            record_cache("plan_cache", "miss")
+            return None
+
+    def set(self, namespace, prompt, value):
+        key = self._key(namespace, prompt)
+        terms = self.embedder.terms(prompt)
+        embedding = self.embedder.embed(prompt).astype(np.float32)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, namespace, prompt, terms, embedding, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, namespace, prompt, json.dumps(terms), embedding.tobytes(), json.dumps(value, ensure_ascii=False), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+            self._index.pop(namespace, None)
+            self.metrics['stores'] += 1
+
+    # Drop expired entries, then the least recently used ones beyond max_entries
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def stats(self):
+        stats = {name: self.metrics[name] for name in ('exact_hits', 'semantic_hits', 'misses', 'stores')}
+        lookups = stats['exact_hits'] + stats['semantic_hits'] + stats['misses']
+        hits = stats['exact_hits'] + stats['semantic_hits']
+        return {**stats, 'lookups': lookups, 'hit_rate': hits / lookups if lookups else 0.0}
+
+@resource
+def get_plan_cache():
+    return SemanticCache()
@@ -0,0 +1,331 @@
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from resources import get_nlp
+
+# Deterministic slot extraction for the chat assistant. Anything it can't read with certainty
+# is left unset (or flagged ambiguous) so the LLM can handle it.
+
+MONTHS = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3, 'apr': 4, 'april': 4,
+    'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7, 'aug': 8, 'august': 8, 'sep': 9, 'sept': 9,
+    'september': 9, 'oct': 10, 'october': 10, 'nov': 11, 'november': 11, 'dec': 12, 'december': 12
+}
+NUMBER_WORDS = {
+    'no': 0, 'zero': 0, 'a': 1, 'an': 1, 'one': 1, 'single': 1, 'two': 2, 'three': 3, 'four': 4,
+    'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10
+}
+CURRENCY_SYMBOLS = {'$': 'USD', 'S$': 'SGD', 'US$': 'USD', '€': 'EUR', '£': 'GBP', '₹': 'INR', '¥': 'JPY', '₫': 'VND'}
+CURRENCY_WORDS = {'dollars': 'USD', 'bucks': 'USD', 'euros': 'EUR', 'pounds': 'GBP', 'rupees': 'INR', 'yen': 'JPY'}
+CURRENCY_CODES = {'USD', 'SGD', 'EUR', 'GBP', 'INR', 'JPY', 'AUD', 'CAD', 'VND', 'THB', 'MYR', 'AED', 'CHF', 'CNY', 'HKD', 'NZD', 'IDR', 'PHP'}
+
+# Common airports, so lower-case codes like "sin to blr" are still recognised
+IATA_CITIES = {
+    'SIN': 'Singapore', 'BLR': 'Bangalore', 'BOM': 'Mumbai', 'DEL': 'Delhi', 'MAA': 'Chennai', 'HYD': 'Hyderabad',
+    'CCU': 'Kolkata', 'COK': 'Kochi', 'GOI': 'Goa', 'LHR': 'London', 'LGW': 'London', 'CDG': 'Paris', 'FRA': 'Frankfurt',
+    'AMS': 'Amsterdam', 'FCO': 'Rome', 'BCN': 'Barcelona', 'MAD': 'Madrid', 'JFK': 'New York', 'EWR': 'Newark',
+    'LAX': 'Los Angeles', 'SFO': 'San Francisco', 'ORD': 'Chicago', 'SEA': 'Seattle', 'YYZ': 'Toronto', 'DXB': 'Dubai',
+    'DOH': 'Doha', 'IST': 'Istanbul', 'BKK': 'Bangkok', 'HKT': 'Phuket', 'KUL': 'Kuala Lumpur', 'CGK': 'Jakarta',
+    'DPS': 'Bali', 'MNL': 'Manila', 'SGN': 'Ho Chi Minh City', 'HAN': 'Hanoi', 'DAD': 'Da Nang', 'HKG': 'Hong Kong',
+    'TPE': 'Taipei', 'ICN': 'Seoul', 'NRT': 'Tokyo', 'HND': 'Tokyo', 'KIX': 'Osaka', 'PEK': 'Beijing', 'PVG': 'Shanghai',
+    'SYD': 'Sydney', 'MEL': 'Melbourne', 'AKL': 'Auckland', 'CMB': 'Colombo', 'KTM': 'Kathmandu', 'MLE': 'Male'
+}
+
+MONTH = r'(?P<{name}>' + '|'.join(sorted(MONTHS, key=len, reverse=True)) + r')\.?'
+DAY = r'(?P<{name}>\d{{1,2}})(?:st|nd|rd|th)?'
+YEAR = r'(?:,?\s*(?P<{name}>\d{{4}}))?'
+RANGE_SEP = r'\s*(?:-|–|to|till|until|through|thru)\s*'
+NUMBER = r'(?P<count>\d+|' + '|'.join(NUMBER_WORDS) + r')'
+WEEKDAYS = r'monday|tuesday|wednesday|thursday|friday|saturday|sunday'
+# Capitalised words never part of a place name, even in Title Case messages ("To London On Friday")
+NOT_PLACE_WORDS = r'i|the|and|or|on|in|at|by|for|with|from|to|via|after|before|during|until|till|next|this|week|weekend|' + WEEKDAYS
+# Capitalised words, stopping before month names ("to Bali Oct 18"), weekdays and function words
+PLACE_WORD = r"(?!(?i:" + '|'.join(MONTHS) + '|' + NOT_PLACE_WORDS + r")\b)[A-Z][\w.'-]*"
+PLACE = PLACE_WORD + r"(?:\s+" + PLACE_WORD + r")*"
+# A second place right after the first ("to Paris and Rome"): the slot can't hold both
+MORE_PLACES = re.compile(r"\s*(?:&|\b(?i:and|or)\b)\s*" + PLACE_WORD)
+KNOWN_PLACES = {city.lower() for city in IATA_CITIES.values()} | {code.lower() for code in IATA_CITIES}
+
+def _compile(pattern):
+    return re.compile(pattern, re.IGNORECASE)
+
+# "18-25 Oct", "18 to 25 October 2024"
+DAY_RANGE = _compile(DAY.format(name='d1') + RANGE_SEP + DAY.format(name='d2') + r'\s+(?:of\s+)?' + MONTH.format(name='m') + YEAR.format(name='y'))
+# "Oct 18-25"
+MONTH_DAY_RANGE = _compile(MONTH.format(name='m') + r'\s+' + DAY.format(name='d1') + RANGE_SEP + DAY.format(name='d2') + YEAR.format(name='y'))
+# "18 Oct", "18th of October 2024"
+DAY_MONTH = _compile(DAY.format(name='d') + r'\s+(?:of\s+)?' + MONTH.format(name='m') + YEAR.format(name='y'))
+# "Oct 18", "October 18th, 2024"
+MONTH_DAY = _compile(MONTH.format(name='m') + r'\s+' + DAY.format(name='d') + r'(?!\d)' + YEAR.format(name='y'))
+ISO_DATE = re.compile(r'\b(?P<y>\d{4})-(?P<m>\d{1,2})-(?P<d>\d{1,2})\b')
+NUMERIC_DATE = re.compile(r'\b(?P<a>\d{1,2})/(?P<b>\d{1,2})(?:/(?P<y>\d{2,4}))?\b')
+RELATIVE_DATE = _compile(r'\b(?:today|tomorrow|tonight|next\s+\w+|this\s+(?:week|weekend|month)|weekend|in\s+\d+\s+(?:days|weeks)|' + WEEKDAYS + r')\b')
+RETURN_HINT = _compile(r'\b(?:return(?:ing)?|back|until|till|leave\s+on|come\s+back)\b')
+
+IATA_ROUTE = _compile(r'\b(?P<src>[a-z]{3})\s*(?:to|-|–|→|->|>|/)\s*(?P<des>[a-z]{3})\b')
+FROM_TO = re.compile(r'\b[Ff]rom\s+(?P<src>' + PLACE + r')\s+to\s+(?P<des>' + PLACE + r')')
+TO_FROM = re.compile(r'\b[Tt]o\s+(?P<des>' + PLACE + r')\s+from\s+(?P<src>' + PLACE + r')')
+TO_PLACE = re.compile(r'\b(?:[Tt]o|[Vv]isit(?:ing)?)\s+(?P<des>' + PLACE + r')')
+FROM_PLACE = re.compile(r'\b[Ff]rom\s+(?P<src>' + PLACE + r')')
+
+ADULTS = _compile(r'\b' + NUMBER + r'\s+(?:adults?|grown-?ups?)\b')
+PEOPLE = _compile(r'\b' + NUMBER + r'\s+(?:people|persons|pax|travell?ers|passengers|of\s+us)\b')
+CHILDREN = _compile(r'\b' + NUMBER + r'\s+(?:kids?|child(?:ren)?)\b')
+INFANTS = _compile(r'\b' + NUMBER + r'\s+(?:infants?|bab(?:y|ies)|toddlers?)\b')
+ROOMS = _compile(r'\b' + NUMBER + r'\s+(?:hotel\s+)?rooms?\b')
+SOLO = _compile(r'\b(?:solo|alone|by myself|just me|on my own)\b')
+COUPLE = _compile(r'\b(?:a couple|my (?:wife|husband|partner|girlfriend|boyfriend) and (?:i|me)|me and my (?:wife|husband|partner|girlfriend|boyfriend))\b')
+
+AMOUNT = r'(?P<amount>\d[\d,]*(?:\.\d+)?)\s?(?P<k>k)?\b'
+SYMBOL_BUDGET = re.compile(r'(?P<cur>US\$|S\$|[$€£₹¥₫])\s?' + AMOUNT, re.IGNORECASE)
+CODE_BEFORE_BUDGET = re.compile(r'\b(?P<cur>' + '|'.join(CURRENCY_CODES) + r')\s?' + AMOUNT, re.IGNORECASE)
+CODE_AFTER_BUDGET = re.compile(AMOUNT + r'\s?(?P<cur>' + '|'.join(CURRENCY_CODES | set(CURRENCY_WORDS)) + r')\b', re.IGNORECASE)
+PLAIN_BUDGET = _compile(r'\bbudget\s+(?:is\s+|of\s+|around\s+|about\s+)*' + AMOUNT)
+
+# Words that carry no slot information; a message made only of these plus extracted spans is fully resolved
+FILLER_WORDS = set('''
+a an and are around about at be book booking budget by can could do for from fly flying flight flights get going
+hi hello hey hotel hotels i i'd i'm in is it just like looking me my need of on or our please plus return returning round
+trip the there to travel travelling traveling trip us want we we'd we're will with would total max maximum up under
+'''.split())
+
+@dataclass
+class SlotExtraction:
+    slots: dict = field(default_factory=dict)
+    ambiguous: set = field(default_factory=set)
+    residual: list = field(default_factory=list)
+    # Slots read heuristically (a place name that isn't a known city); the LLM's reading wins over these
+    tentative: set = field(default_factory=set)
+
+    # True when every word of the message was accounted for and nothing needs interpretation
+    @property
+    def fully_resolved(self):
+        return bool(self.slots) and not self.ambiguous and not self.residual and not self.tentative
+
+    @property
+    def certain_slots(self):
+        return {slot: value for slot, value in self.slots.items() if slot not in self.tentative}
+
+_nlp_unavailable = False
+
+# spaCy is optional here: without the model only the regex rules run
+def _get_nlp():
+    global _nlp_unavailable
+    if _nlp_unavailable:
+        return None
+    try:
+        return get_nlp()
+    except (ImportError, OSError):
+        _nlp_unavailable = True
+        return None
+
+def _count(text):
+    text = text.lower()
+    return NUMBER_WORDS[text] if text in NUMBER_WORDS else int(text)
+
+def _resolve_date(day, month, year, today):
+    month = MONTHS[month.lower().rstrip('.')] if isinstance(month, str) else month
+    try:
+        if year:
+            return date(int(year), month, int(day))
+        # Without a year, take the next occurrence of that day
+        candidate = date(today.year, month, int(day))
+        return candidate if candidate >= today else date(today.year + 1, month, int(day))
+    except ValueError:
+        return None
+
+class _Extractor:
+    def __init__(self, text, today, current):
+        self.text = text
+        self.today = today
+        self.current = current
+        self.result = SlotExtraction()
+        self.consumed = []
+
+    def take(self, match, group=0):
+        self.consumed.append(match.span(group))
+
+    def free(self, match, group=0):
+        start, end = match.span(group)
+        return not any(start < c_end and c_start < end for c_start, c_end in self.consumed)
+
+    def set(self, slot, value):
+        existing = self.result.slots.get(slot)
+        if existing is not None and existing != value:
+            # Two different readings of the same slot in one message
+            self.result.ambiguous.add(slot)
+            self.result.slots.pop(slot)
+        elif slot not in self.result.ambiguous:
+            self.result.slots[slot] = value
+
+    def routes(self):
+        for match in IATA_ROUTE.finditer(self.text):
+            src, des = match.group('src'), match.group('des')
+            known = src.upper() in IATA_CITIES and des.upper() in IATA_CITIES
+            typed_codes = src.isupper() and des.isupper() and not {src, des} & CURRENCY_CODES
+            if known or typed_codes:
+                self.set('departure_city', src.upper())
+                self.set('destination', des.upper())
+                self.take(match)
+        for pattern in (FROM_TO, TO_FROM):
+            for match in pattern.finditer(self.text):
+                if self.free(match):
+                    self.set_place('departure_city', match, 'src')
+                    self.set_place('destination', match, 'des')
+                    self.take(match)
+        for match in TO_PLACE.finditer(self.text):
+            if self.free(match) and not MONTHS.get(match.group('des').lower()):
+                self.set_place('destination', match, 'des')
+                self.take(match)
+        for match in FROM_PLACE.finditer(self.text):
+            if self.free(match):
+                self.set_place('departure_city', match, 'src')
+                self.take(match)
+
+    # Capitalised words are only a guess at a place unless they name a known city
+    def set_place(self, slot, match, group):
+        if MORE_PLACES.match(self.text, match.end(group)):
+            self.result.ambiguous.add(slot)
+            return
+        value = match.group(group)
+        self.set(slot, value)
+        if value.lower() not in KNOWN_PLACES:
+            self.result.tentative.add(slot)
+
+    # A single place named without "from"/"to" (e.g. answering "Where would you like to go?")
+    # fills whichever of destination/departure city is still open
+    def places_from_entities(self):
+        nlp = _get_nlp()
+        if nlp is None or 'destination' in self.result.slots or 'departure_city' in self.result.slots:
+            return
+        places = [
+            ent for ent in nlp(self.text).ents
+            if ent.label_ in ('GPE', 'LOC') and not any(ent.start_char < end and start < ent.end_char for start, end in self.consumed)
+        ]
+        if len(places) != 1:
+            return
+        if not self.current.get('destination'):
+            slot = 'destination'
+        elif not self.current.get('departure_city'):
+            slot = 'departure_city'
+        else:
+            return
+        self.set(slot, places[0].text)
+        self.result.tentative.add(slot)
+        self.consumed.append((places[0].start_char, places[0].end_char))
+
+    def dates(self):
+        found = []
+        for pattern in (DAY_RANGE, MONTH_DAY_RANGE):
+            for match in pattern.finditer(self.text):
+                if self.free(match):
+                    first = _resolve_date(match.group('d1'), match.group('m'), match.group('y'), self.today)
+                    second = None
+                    if first:
+                        # The end of the range follows its start: "28-3 Oct" ends in November,
+                        # and "18-25 Oct" never straddles a new year
+                        d1, d2 = int(match.group('d1')), int(match.group('d2'))
+                        second = _resolve_date(d2, first.month if d2 >= d1 else first.month % 12 + 1, None, first)
+                    found += [(match.start(), first), (match.start() + 1, second)]
+                    self.take(match)
+        for pattern in (ISO_DATE, DAY_MONTH, MONTH_DAY):
+            for match in pattern.finditer(self.text):
+                if self.free(match):
+                    month = int(match.group('m')) if pattern is ISO_DATE else match.group('m')
+                    found.append((match.start(), _resolve_date(match.group('d'), month, match.group('y'), self.today)))
+                    self.take(match)
+        for match in NUMERIC_DATE.finditer(self.text):
+            if self.free(match):
+                a, b = int(match.group('a')), int(match.group('b'))
+                year = match.group('y')
+                year = f"20{year}" if year and len(year) == 2 else year
+                if a > 12 >= b:
+                    found.append((match.start(), _resolve_date(a, b, year, self.today)))
+                elif b > 12 >= a:
+                    found.append((match.start(), _resolve_date(b, a, year, self.today)))
+                else:
+                    self.result.ambiguous.add('departure_date')
+                self.take(match)
+        if RELATIVE_DATE.search(self.text):
+            self.result.ambiguous.add('departure_date')
+
+        if any(value is None for _, value in found):
+            self.result.ambiguous.add('departure_date')
+            return
+        found = sorted(found)
+        if len(found) == 2:
+            self.set('departure_date', found[0][1].isoformat())
+            self.set('return_date', found[1][1].isoformat())
+        elif len(found) == 1:
+            position, value = found[0]
+            if RETURN_HINT.search(self.text[:position]) or self.current.get('departure_date'):
+                self.set('return_date', value.isoformat())
+            else:
+                self.set('departure_date', value.isoformat())
+        elif len(found) > 2:
+            self.result.ambiguous.update({'departure_date', 'return_date'})
+
+    def travellers(self):
+        counts = [('num_adults', ADULTS), ('num_children', CHILDREN), ('num_infants', INFANTS), ('num_rooms', ROOMS)]
+        for slot, pattern in counts:
+            for match in pattern.finditer(self.text):
+                if self.free(match):
+                    self.set(slot, _count(match.group('count')))
+                    self.take(match)
+        for match in PEOPLE.finditer(self.text):
+            if self.free(match):
+                # "3 people" is only a clear adult count when no children or infants are involved;
+                # next to an explicit adult count it's just the group total
+                if 'num_children' in self.result.slots or 'num_infants' in self.result.slots:
+                    if 'num_adults' not in self.result.slots:
+                        self.result.ambiguous.add('num_adults')
+                elif 'num_adults' not in self.result.slots:
+                    self.set('num_adults', _count(match.group('count')))
+                self.take(match)
+        for match in SOLO.finditer(self.text):
+            self.set('num_adults', 1)
+            self.set('num_children', 0)
+            self.set('num_infants', 0)
+            self.take(match)
+        for match in COUPLE.finditer(self.text):
+            self.set('num_adults', 2)
+            self.take(match)
+
+    def budget(self):
+        for pattern in (SYMBOL_BUDGET, CODE_BEFORE_BUDGET, CODE_AFTER_BUDGET, PLAIN_BUDGET):
+            for match in pattern.finditer(self.text):
+                if not self.free(match):
+                    continue
+                amount = float(match.group('amount').replace(',', ''))
+                if match.group('k'):
+                    amount *= 1000
+                currency = match.groupdict().get('cur')
+                if currency:
+                    currency = CURRENCY_SYMBOLS.get(currency.upper(), CURRENCY_SYMBOLS.get(currency)) or CURRENCY_WORDS.get(currency.lower()) or currency.upper()
+                amount = f"{amount:g}" if amount < 1e6 else f"{amount:.0f}"
+                self.set('budget', f"{currency} {amount}" if currency else amount)
+                self.take(match)
+
+    def residual(self):
+        text = self.text
+        for start, end in sorted(self.consumed, reverse=True):
+            text = text[:start] + ' ' + text[end:]
+        words = re.findall(r"[a-z0-9']+", text.lower())
+        self.result.residual = [word for word in words if word not in FILLER_WORDS]
+
+    def run(self):
+        self.routes()
+        self.dates()
+        self.travellers()
+        self.budget()
+        self.places_from_entities()
+        self.residual()
+        for slot in self.result.ambiguous:
+            self.result.slots.pop(slot, None)
+        self.result.tentative &= set(self.result.slots)
+        return self.result
+
+# Extract whatever slots can be read with certainty from one message.
+# `current` holds the slots already filled; it only decides how a lone date is used.
+def extract_slots(text, today=None, current=None):
+    return _Extractor(text, today or date.today(), current or {}).run()
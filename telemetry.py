@@ -0,0 +1,222 @@
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Export settings; both exporters are off unless configured
+PROMETHEUS_PORT = int(os.getenv("TELEMETRY_PROMETHEUS_PORT", "0"))
+# Loopback only by default; set to 0.0.0.0 to let a Prometheus on another host scrape it
+PROMETHEUS_HOST = os.getenv("TELEMETRY_PROMETHEUS_HOST", "127.0.0.1")
+# OTLP/HTTP collector, e.g. http://localhost:4318/v1/traces; needs opentelemetry-sdk and
+# opentelemetry-exporter-otlp-proto-http
+OTLP_ENDPOINT = os.getenv("TELEMETRY_OTLP_ENDPOINT", "")
+SERVICE_NAME = os.getenv("TELEMETRY_SERVICE_NAME", "travel-planner")
+
+METRIC_PREFIX = "travelplanner"
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Recent durations kept per span for percentiles in the UI
+RECENT_SAMPLES = 512
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    escaped = [(name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for name, value in pairs]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+# Duration histogram of one span name and label set
+class SpanStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds, error):
+        self.count += 1
+        self.total += seconds
+        self.errors += error
+        self.recent.append(seconds)
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+
+    def percentile(self, q):
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+# In-process store of span durations and counters, shared by every thread and session
+class Registry:
+    def __init__(self):
+        self.spans = defaultdict(SpanStats)
+        self.counters = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def observe(self, name, labels, seconds, error=False):
+        with self._lock:
+            self.spans[(name, _label_key(labels))].observe(seconds, error)
+
+    def increment(self, name, labels, value=1):
+        with self._lock:
+            self.counters[(name, _label_key(labels))] += value
+
+    # Sum of a counter over every label set that includes `labels`
+    def total(self, name, **labels):
+        wanted = set(_label_key(labels))
+        with self._lock:
+            return sum(value for (counter_name, key), value in self.counters.items() if counter_name == name and wanted <= set(key))
+
+    # One row per span name and label set, for the timing panel
+    def span_summary(self):
+        with self._lock:
+            return [
+                {
+                    'span': name,
+                    'labels': ", ".join(f"{key}={value}" for key, value in labels),
+                    'count': stats.count,
+                    'errors': stats.errors,
+                    'mean_ms': stats.total / stats.count * 1000,
+                    'p50_ms': stats.percentile(0.5) * 1000,
+                    'p95_ms': stats.percentile(0.95) * 1000
+                }
+                for (name, labels), stats in sorted(self.spans.items())
+            ]
+
+    # Prometheus text exposition format
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            metric = f"{METRIC_PREFIX}_span_duration_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for (name, labels), stats in sorted(self.spans.items()):
+                labels = (('span', name), *labels)
+                for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                    lines.append(f"{metric}_bucket{_format_labels([*labels, ('le', str(bound))])} {count}")
+                lines.append(f"{metric}_bucket{_format_labels([*labels, ('le', '+Inf')])} {stats.count}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {stats.total}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {stats.count}")
+
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name} counter")
+                for (counter_name, labels), value in sorted(self.counters.items()):
+                    if counter_name == name:
+                        lines.append(f"{METRIC_PREFIX}_{name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+def _otel_tracer():
+    if not OTLP_ENDPOINT:
+        return None
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        return None
+    provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=OTLP_ENDPOINT)))
+    trace.set_tracer_provider(provider)
+    return trace.get_tracer(__name__)
+
+_tracer = _otel_tracer()
+
+# Time a block as a span: recorded in the registry and, when configured, exported over OTLP.
+# Works unchanged inside coroutines.
+@contextmanager
+def span(name, **labels):
+    otel_span = _tracer.start_as_current_span(name, attributes={k: str(v) for k, v in labels.items()}) if _tracer else None
+    start = time.perf_counter()
+    error = False
+    try:
+        if otel_span is None:
+            yield
+        else:
+            with otel_span:
+                yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        REGISTRY.observe(name, labels, time.perf_counter() - start, error)
+
+def increment(name, value=1, **labels):
+    REGISTRY.increment(name, labels, value)
+
+# One counter for every cache, so hit rates are comparable across them. `result` is "miss" or
+# the kind of hit ("hit", "stale", "coalesced", ...).
+def record_cache(cache, result):
+    increment("cache_lookups_total", cache=cache, result=result)
+
+def cache_hit_rate(cache):
+    lookups = REGISTRY.total("cache_lookups_total", cache=cache)
+    misses = REGISTRY.total("cache_lookups_total", cache=cache, result="miss")
+    return 1 - misses / lookups if lookups else 0.0
+
+def _estimate_tokens(text):
+    # Same rough four-characters-per-token count as context_budget
+    return math.ceil(len(text) / 4)
+
+# Prompt and completion tokens per Groq call, from the usage block of each response. Streamed
+# calls end without one, so their tokens are estimated from the prompt and the streamed text.
+class TokenUsageHandler(BaseCallbackHandler):
+    def __init__(self):
+        self._runs = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        model = (serialized.get("kwargs") or {}).get("model_name", "unknown")
+        prompt = "".join(str(message.content) for batch in messages for message in batch)
+        self._runs[run_id] = (model, _estimate_tokens(prompt))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._runs.pop(run_id, None)
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        started_model, prompt_tokens = self._runs.pop(run_id, ("unknown", 0))
+        llm_output = response.llm_output or {}
+        usage = llm_output.get("token_usage") or {}
+        model = llm_output.get("model_name", started_model)
+        if not usage:
+            completion = "".join(generation.text for generations in response.generations for generation in generations)
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": _estimate_tokens(completion)}
+        increment("llm_calls_total", model=model)
+        for direction in ("prompt", "completion"):
+            if usage.get(f"{direction}_tokens"):
+                increment("llm_tokens_total", usage[f"{direction}_tokens"], model=model, direction=direction)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+_server_lock = threading.Lock()
+
+# Serve /metrics for Prometheus to scrape; a no-op when no port is configured or already serving
+def start_metrics_server(port=PROMETHEUS_PORT, host=PROMETHEUS_HOST):
+    global _server
+    with _server_lock:
+        if _server is not None or not port:
+            return _server
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
@@ -0,0 +1,44 @@
+import asyncio
+from types import SimpleNamespace
+from browser_pool import BrowserPool
+from Hotels_Scrapper import HOTEL_CARD_CSS, HOTEL_LISTING
+from listing_stream import stream_listings
+
+CARD = "<div data-testid='property-card'><div data-testid='title'>Hotel {}</div></div>"
+
+# Each render shows two more cards, like a Load More click
+class FakeCrawler:
+    started = 0
+
+    def __init__(self):
+        self.renders = 0
+        self.crawler_strategy = SimpleNamespace(browser=None, kill_session=self.kill_session)
+
+    async def kill_session(self, session_id):
+        pass
+
+    async def __aenter__(self):
+        FakeCrawler.started += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def arun(self, **kwargs):
+        self.renders += 1
+        cards = "".join(CARD.format(index) for index in range(self.renders * 2))
+        return SimpleNamespace(success=True, html=f"<html><body>{cards}</body></html>")
+
+def test_every_streamed_render_counts_towards_recycling():
+    async def run():
+        FakeCrawler.started = 0
+        async with BrowserPool(size=1, max_pages=3, crawler_factory=FakeCrawler) as pool:
+            async with pool.crawler() as crawler:
+                hotels = [hotel async for hotel in stream_listings(crawler, 'https://example.com', HOTEL_LISTING, HOTEL_CARD_CSS, max_pages=3)]
+            async with pool.crawler() as crawler:
+                await crawler.arun(url='https://example.com')
+        return len(hotels)
+
+    assert asyncio.run(run()) == 6
+    # Three renders in one borrow used up the first browser
+    assert FakeCrawler.started == 2
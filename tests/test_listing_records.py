@@ -0,0 +1,16 @@
+import math
+from scrape_batch import BatchResult
+from listing_records import FlightTable, HotelTable, parse_distance_km
+
+def test_empty_tables_rank_to_empty_tables():
+    assert len(HotelTable.from_listings([]).best_rated()) == 0
+    assert len(HotelTable.from_listings([]).cheapest(max_distance_km=2)) == 0
+    assert len(FlightTable.from_listings([]).fastest()) == 0
+    assert len(FlightTable.from_batch([]).cheapest()) == 0
+    assert len(FlightTable.from_batch([BatchResult({'src': 'SIN'}, None, 'blocked')]).cheapest()) == 0
+
+def test_parse_distance_km():
+    assert parse_distance_km('1,200 m from centre') == 1.2
+    assert parse_distance_km('1.2 km from centre') == 1.2
+    assert parse_distance_km('0,5 km') == 0.5
+    assert math.isnan(parse_distance_km('near the beach'))
@@ -0,0 +1,124 @@
+import asyncio
+from Hotels_Scrapper import store_hotel_metadata, with_hotel_metadata
+from providers import PROVIDERS, FlightSearchTool, HotelSearchTool, ListingMerger, Provider, search_merged, stream_merged
+from scraper_cache import ScraperCache
+
+class FakeProvider(Provider):
+    def __init__(self, name, kind, listings=None, delay=0.0, error=None):
+        self.name = name
+        self.kind = kind
+        self.listings = listings or []
+        self.delay = delay
+        self.error = error
+        self.cancelled = False
+
+    async def search(self, query, limit=None):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.listings
+
+def names(listings, field='hotel_name'):
+    return sorted(listing[field] for listing in listings)
+
+def test_hotels_merge_across_providers():
+    merger = ListingMerger('hotels', place='Hanoi')
+    merger.add('booking', [
+        {'hotel_name': 'Hanoi Grand Hotel', 'location': 'Hoan Kiem, Hanoi', 'distance': '0.5 km', 'price': 'VND 1,200,000', 'review_score': '8.9'}
+    ])
+    merger.add('booking_lite', [{'hotel_name': 'The Grand Hanoi', 'price': 'VND 1,100,000'}])
+    [listing] = merger.top_k()
+    assert listing['sources'] == ['booking', 'booking_lite']
+    assert listing['price'] == 1100000
+    assert listing['review_score'] == 8.9
+
+def test_generic_names_in_the_searched_city_stay_apart():
+    merger = ListingMerger('hotels', place='Hanoi')
+    merger.add('booking', [{'hotel_name': 'Hotel Hanoi', 'price': 'VND 900,000'}])
+    merger.add('booking_lite', [{'hotel_name': 'Resort Hanoi', 'price': 'VND 950,000'}])
+    assert names(merger.top_k()) == ['Hotel Hanoi', 'Resort Hanoi']
+
+def test_same_name_elsewhere_is_another_hotel():
+    merger = ListingMerger('hotels', place='Hanoi')
+    merger.add('booking', [
+        {'hotel_name': 'Sunrise Hotel', 'location': 'Hoan Kiem, Hanoi', 'distance': '0.4 km', 'price': 'VND 700,000'},
+        {'hotel_name': 'Sunrise Hotel', 'location': 'Tay Ho, Hanoi', 'distance': '5 km', 'price': 'VND 600,000'}
+    ])
+    assert len(merger.top_k()) == 2
+    merger.add('booking_lite', [{'hotel_name': 'Sunrise', 'price': 'VND 650,000'}])
+    assert len(merger.top_k()) == 2
+
+def test_flights_merge_by_time_or_fare():
+    merger = ListingMerger('flights')
+    merger.add('bing', [
+        {'airline_name': 'Vietnam Airlines', 'departure_time': '08:05', 'price': 'SGD 200'},
+        {'airline_name': 'Vietnam Airlines', 'departure_time': '19:40', 'price': 'SGD 260'}
+    ])
+    merger.add('kayak', [{'airline_name': 'Vietnam Airlines', 'price': 'SGD 201'}])
+    listings = merger.top_k()
+    assert [listing['sources'] for listing in listings] == [['bing', 'kayak'], ['bing']]
+
+def test_stream_yields_as_providers_answer():
+    fast = FakeProvider('fast', 'hotels', [{'hotel_name': 'Alpha Hotel', 'price': 'USD 50'}])
+    slow = FakeProvider('slow', 'hotels', [{'hotel_name': 'Beta Hotel', 'price': 'USD 40'}], delay=0.05)
+
+    async def collect():
+        return [names(listings) async for listings in stream_merged('hotels', {}, [fast, slow], deadline=1)]
+
+    assert asyncio.run(collect()) == [['Alpha Hotel'], ['Alpha Hotel', 'Beta Hotel']]
+
+def test_deadline_cancels_slow_providers():
+    fast = FakeProvider('fast', 'hotels', [{'hotel_name': 'Alpha Hotel', 'price': 'USD 50'}])
+    stuck = FakeProvider('stuck', 'hotels', [{'hotel_name': 'Beta Hotel', 'price': 'USD 40'}], delay=10)
+    merged = asyncio.run(search_merged('hotels', {}, [fast, stuck], deadline=0.1))
+    assert names(merged) == ['Alpha Hotel']
+    assert stuck.cancelled
+
+def test_failing_provider_is_left_out():
+    broken = FakeProvider('broken', 'flights', error=RuntimeError("blocked"))
+    working = FakeProvider('working', 'flights', [{'airline_name': 'Scoot', 'price': 'SGD 140'}])
+    merged = asyncio.run(search_merged('flights', {}, [broken, working], deadline=1))
+    assert names(merged, 'airline_name') == ['Scoot']
+    assert asyncio.run(search_merged('flights', {}, [broken], deadline=1)) == []
+
+def test_tools_read_route_and_dates():
+    subject, query = FlightSearchTool()._query("Singapore to HAN, 2024-11-01, 2024-11-08")
+    assert subject == "flights SIN to HAN"
+    assert (query['src'], query['des'], query['ddate'], query['rdate']) == ('SIN', 'HAN', '2024-11-01', '2024-11-08')
+    subject, query = HotelSearchTool()._query("Hanoi, 2024-11-01, 2024-11-05")
+    assert (query['destination'], query['checkin_date'], query['checkout_date']) == ('Hanoi', '2024-11-01', '2024-11-05')
+    assert HotelSearchTool()._query("Hanoi").startswith("Input must be")
+
+def test_tool_calls_share_one_loop(monkeypatch):
+    loops = []
+
+    class LoopProvider(Provider):
+        name = 'loop'
+        kind = 'hotels'
+
+        async def search(self, query, limit=None):
+            loops.append(asyncio.get_running_loop())
+            return [{'hotel_name': 'Alpha Hotel', 'price': 'USD 50'}]
+
+    monkeypatch.setitem(PROVIDERS, 'hotels', [LoopProvider()])
+    tool = HotelSearchTool()
+    assert "Alpha Hotel" in tool.run("Hanoi, 2024-11-01, 2024-11-05")
+    assert "Alpha Hotel" in tool.run("Hanoi, 2024-11-01, 2024-11-05")
+    assert len(loops) == 2 and loops[0] is loops[1]
+
+def test_booking_lite_listings_get_known_hotel_details(tmp_path):
+    cache = ScraperCache(str(tmp_path / "cache.sqlite3"))
+    store_hotel_metadata(cache, 'Hanoi', [
+        {'hotel_name': 'Sunrise Hotel', 'location': 'Tay Ho, Hanoi', 'distance': '5 km', 'price': 'VND 600,000', 'review_score': '8.1'}
+    ])
+    [lite] = with_hotel_metadata('hanoi', [{'hotel_name': 'Sunrise Hotel', 'price': 'VND 550,000'}], cache)
+    assert (lite['location'], lite['distance'], lite['review_score'], lite['price']) == ('Tay Ho, Hanoi', '5 km', '8.1', 'VND 550,000')
+
+    merger = ListingMerger('hotels', place='Hanoi')
+    merger.add('booking', [{'hotel_name': 'Sunrise Hotel', 'location': 'Hoan Kiem, Hanoi', 'distance': '0.4 km', 'price': 'VND 700,000'}])
+    merger.add('booking_lite', [lite])
+    assert len(merger.top_k()) == 2
@@ -0,0 +1,19 @@
+from semantic_cache import HashingEmbedder, SemanticCache
+
+def make_cache(tmp_path):
+    cache = SemanticCache(path=str(tmp_path / "plans.sqlite3"), embedder=HashingEmbedder())
+    cache.set('plan', "2 weeks in Vietnam, budget backpacker", "vietnam plan")
+    return cache
+
+def test_reordered_prompt_reuses_the_plan(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.get('plan', "Vietnam, 2 weeks, budget backpacker") == "vietnam plan"
+    assert cache.get('plan', "Budget backpacker travelling in Vietnam for 2 weeks") == "vietnam plan"
+    assert cache.get('plan', "budget backpacker - Vietnam - 2 weeks.") == "vietnam plan"
+    assert cache.stats()['semantic_hits'] == 3
+
+def test_other_destination_is_a_miss(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.get('plan', "2 weeks in Thailand, budget backpacker") is None
+    assert cache.get('plan', "3 weeks in Vietnam, budget backpacker") is None
+    assert cache.stats()['misses'] == 2
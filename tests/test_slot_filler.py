@@ -0,0 +1,16 @@
+from datetime import date
+from slot_filler import extract_slots
+
+def dates(text, today):
+    slots = extract_slots(text, today=today).slots
+    return slots.get('departure_date'), slots.get('return_date')
+
+def test_day_range_ends_in_the_year_it_starts():
+    assert dates("2 adults SIN to BLR 18-25 Oct", date(2026, 10, 1)) == ('2026-10-18', '2026-10-25')
+    # Inside and after the range, both ends move to next year together
+    assert dates("2 adults SIN to BLR 18-25 Oct", date(2026, 10, 20)) == ('2027-10-18', '2027-10-25')
+    assert dates("SIN to BLR Oct 18-25", date(2026, 11, 5)) == ('2027-10-18', '2027-10-25')
+
+def test_day_range_rolls_into_the_next_month():
+    assert dates("SIN to BLR 28-3 Oct", date(2026, 10, 1)) == ('2026-10-28', '2026-11-03')
+    assert dates("SIN to BLR 28-3 Dec", date(2026, 10, 1)) == ('2026-12-28', '2027-01-03')